@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK - DSP Performance Checks
+Run: python benchmark.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from scipy import signal
+
+from config import (
+    SAMPLE_RATE, CHUNK_SIZE, BASS_DECIMATION, PITCH_FRAME_SIZE, PITCH_HOP_SIZE,
+    DENOISE_FRAME_SIZE, DENOISE_HOP_SIZE, DENOISE_FLOOR_DB,
+    FEEDBACK_DECIMATION, FEEDBACK_MAX_NOTCHES, FEEDBACK_MAX_DEPTH_DB
+)
+from multirate import MultirateLowpass
+from pitch_shifter import PitchShifter
+from denoiser import SpectralDenoiser
+from feedback import FeedbackSuppressor
+from reference_audio import synthetic_speech
+from sample_format import SampleFormat, FORMATS
+from soundboard import ClipLibrary, Soundboard
+from netstream import UdpSink, UdpReceiver
+
+BLOCKS = 2000
+
+# Real-time CPU limits (fraction of one core)
+PITCH_CPU_LIMIT = 0.30
+
+# Minimum SNR gain of the denoiser on synthetic noisy speech (dB)
+DENOISE_MIN_IMPROVEMENT = 3.0
+
+# Minimum howl reduction of the feedback suppressor in a simulated loop (dB)
+FEEDBACK_MIN_REDUCTION = 20.0
+
+
+def time_per_block(process, blocks=BLOCKS, blocksize=CHUNK_SIZE):
+    """Average seconds per call of process(block) on white noise"""
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((blocks, blocksize)) * 0.1
+
+    # Warm up caches and lazy allocations
+    for block in data[:10]:
+        process(block)
+
+    start = time.perf_counter()
+    for block in data:
+        process(block)
+    return (time.perf_counter() - start) / blocks
+
+
+def tone_gain(process, freq, seconds=1.0, blocksize=CHUNK_SIZE):
+    """Steady-state gain of a block processor at one frequency"""
+    n = int(SAMPLE_RATE * seconds) // blocksize * blocksize
+    t = np.arange(n) / SAMPLE_RATE
+    tone = np.sin(2 * np.pi * freq * t)
+    out = np.concatenate([
+        process(tone[i:i + blocksize]) for i in range(0, n, blocksize)
+    ])
+    half = n // 2
+    return np.sqrt(np.mean(out[half:] ** 2) / np.mean(tone[half:] ** 2))
+
+
+def print_header(title):
+    print("\n" + "=" * 60)
+    print(f"📊 {title}")
+    print("=" * 60)
+
+
+def bench_bass_multirate():
+    """Full-rate vs multirate 150 Hz bass lowpass"""
+    print_header("BASS PATH: FULL RATE vs MULTIRATE")
+
+    def full_rate_path():
+        sos = signal.butter(4, 150, 'lowpass', fs=SAMPLE_RATE, output='sos')
+        state = {"zi": np.zeros((sos.shape[0], 2))}
+
+        def process(block):
+            out, state["zi"] = signal.sosfilt(sos, block, zi=state["zi"])
+            return out
+        return process
+
+    def multirate_path():
+        return MultirateLowpass(4, 150, SAMPLE_RATE, BASS_DECIMATION).process
+
+    full = time_per_block(full_rate_path())
+    multi = time_per_block(multirate_path())
+    budget = CHUNK_SIZE / SAMPLE_RATE
+    print(f"Block: {CHUNK_SIZE} samples ({budget * 1000:.1f} ms), "
+          f"decimation: {BASS_DECIMATION}x")
+    print(f"Full rate: {full * 1e6:8.1f} us/block ({full / budget:.2%} of budget)")
+    print(f"Multirate: {multi * 1e6:8.1f} us/block ({multi / budget:.2%} of budget)")
+    print(f"Saving:    {(1 - multi / full):.0%}")
+
+    print("\nFreq (Hz)   Full rate   Multirate   Diff")
+    worst = 0.0
+    for freq in [20, 50, 80, 100, 120, 150, 200, 300, 500, 1000, 3000]:
+        g_full = 20 * np.log10(tone_gain(full_rate_path(), freq))
+        g_multi = 20 * np.log10(tone_gain(multirate_path(), freq))
+        if freq <= 150:
+            worst = max(worst, abs(g_full - g_multi))
+        print(f"{freq:9d}   {g_full:6.1f} dB   {g_multi:6.1f} dB   {g_multi - g_full:+5.2f}")
+    print(f"Worst passband difference: {worst:.2f} dB")
+
+
+def dominant_frequency(audio):
+    """Frequency of the strongest spectral peak"""
+    spectrum = np.abs(np.fft.rfft(audio * np.hanning(len(audio))))
+    return np.fft.rfftfreq(len(audio), 1 / SAMPLE_RATE)[np.argmax(spectrum)]
+
+
+def bench_pitch_shifter():
+    """Phase-vocoder pitch shifter CPU cost and accuracy"""
+    print_header("PITCH SHIFTER (STFT PHASE VOCODER)")
+    budget = CHUNK_SIZE / SAMPLE_RATE
+    print(f"Frame: {PITCH_FRAME_SIZE}, hop: {PITCH_HOP_SIZE}, "
+          f"latency: {PITCH_FRAME_SIZE / SAMPLE_RATE * 1000:.1f} ms")
+
+    ok = True
+    for semitones in [7, -5, 12, -12]:
+        per_block = time_per_block(
+            PitchShifter(semitones, PITCH_FRAME_SIZE, PITCH_HOP_SIZE).process
+        )
+        load = per_block / budget
+
+        # 150 Hz sawtooth, roughly a voice fundamental with harmonics
+        shifter = PitchShifter(semitones, PITCH_FRAME_SIZE, PITCH_HOP_SIZE)
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        saw = (t * 150) % 1 - 0.5
+        out = np.concatenate([
+            shifter.process(saw[i:i + CHUNK_SIZE])
+            for i in range(0, len(saw) - CHUNK_SIZE + 1, CHUNK_SIZE)
+        ])
+        got = dominant_frequency(out[len(out) // 2:])
+        want = 150 * 2 ** (semitones / 12)
+
+        passed = load < PITCH_CPU_LIMIT
+        ok = ok and passed
+        print(f"{semitones:+3d} st: {per_block * 1e6:7.1f} us/block, "
+              f"{load:6.2%} of one core {'✅' if passed else '❌'}  "
+              f"150 Hz → {got:.1f} Hz (want {want:.1f})")
+
+    print(f"Limit: {PITCH_CPU_LIMIT:.0%} of one core at {SAMPLE_RATE} Hz mono")
+    return ok
+
+
+def snr_db(clean, noisy):
+    """Signal-to-noise ratio of noisy against clean, in dB"""
+    return 10 * np.log10(np.sum(clean ** 2) / np.sum((noisy - clean) ** 2))
+
+
+def bench_denoiser():
+    """Spectral denoiser CPU cost, latency and SNR improvement"""
+    print_header("CLEAR DENOISER (STFT WIENER FILTER)")
+
+    def make_denoiser():
+        return SpectralDenoiser(
+            SAMPLE_RATE, DENOISE_FRAME_SIZE, DENOISE_HOP_SIZE, DENOISE_FLOOR_DB
+        )
+
+    budget = CHUNK_SIZE / SAMPLE_RATE
+    per_block = time_per_block(make_denoiser().process)
+    latency = make_denoiser().get_stats()["latency_ms"]
+    print(f"CPU: {per_block * 1e6:.1f} us/block ({per_block / budget:.2%} of one core)")
+    print(f"Added latency: {latency:.1f} ms")
+
+    # Offline SNR check: synthetic speech in white noise
+    clean = synthetic_speech(6.0, SAMPLE_RATE)
+    rng = np.random.default_rng(1)
+    warmup = SAMPLE_RATE
+
+    ok = True
+    print("\nInput SNR   Output SNR   Improvement")
+    # Last case opens with a block of digital silence, like a stream start
+    for input_snr, silent_blocks in [(0, 0), (5, 0), (10, 0), (5, 1)]:
+        noise = rng.standard_normal(len(clean))
+        noise *= np.sqrt(np.mean(clean ** 2) / np.mean(noise ** 2) / 10 ** (input_snr / 10))
+        noisy = np.concatenate((np.zeros(silent_blocks * CHUNK_SIZE), clean + noise))
+
+        denoiser = make_denoiser()
+        out = np.concatenate([
+            denoiser.process(noisy[i:i + CHUNK_SIZE])
+            for i in range(0, len(noisy), CHUNK_SIZE)
+        ])[silent_blocks * CHUNK_SIZE:]
+        noisy = noisy[silent_blocks * CHUNK_SIZE:]
+
+        # Align for the STFT latency and skip the noise-floor warm-up
+        delay = denoiser.latency
+        reference = clean[warmup:len(clean) - delay]
+        before = snr_db(reference, noisy[warmup:len(clean) - delay])
+        after = snr_db(reference, out[warmup + delay:])
+
+        passed = after - before >= DENOISE_MIN_IMPROVEMENT
+        ok = ok and passed
+        print(f"{before:6.1f} dB   {after:7.1f} dB   {after - before:+8.1f} dB "
+              f"{'✅' if passed else '❌'}{'  (silent start)' if silent_blocks else ''}")
+
+    print(f"Required improvement: {DENOISE_MIN_IMPROVEMENT:.1f} dB")
+    return ok
+
+
+def bench_fanout():
+    """HIGE + ULTRA + BASS: three separate renders vs one fan-out render"""
+    print_header("FAN-OUT: HIGE + ULTRA + BASS FROM ONE INPUT")
+    from voice_enhancer import VoiceProcessor
+    from fanout import FanoutRenderer
+
+    effects = ["hige", "ultra", "bass"]
+    processors = []
+    for effect in effects:
+        processor = VoiceProcessor()
+        # Compare rendering only - fan-out notches each route separately too
+        processor.cpu_guard = None
+        processor.feedback = None
+        processor.change_effect(effect)
+        processors.append(processor)
+
+    def separate(block):
+        for processor in processors:
+            processor.process_audio(block)
+
+    fanout_processor = VoiceProcessor()
+    fanout_processor.cpu_guard = None
+    fanout_processor.feedback = None
+    renderer = FanoutRenderer(fanout_processor, effects)
+
+    def fanout(block):
+        audio = fanout_processor.prepare_audio(block)
+        for effect, rendered in renderer.render(audio).items():
+            fanout_processor.finish_audio(rendered, 1.0)
+
+    budget = CHUNK_SIZE / SAMPLE_RATE
+    t_separate = time_per_block(separate)
+    t_fanout = time_per_block(fanout)
+    print(f"\n3x process_audio: {t_separate * 1e6:7.1f} us/block ({t_separate / budget:.2%})")
+    print(f"Fan-out render:   {t_fanout * 1e6:7.1f} us/block ({t_fanout / budget:.2%})")
+    print(f"Saving:           {(1 - t_fanout / t_separate):.0%}")
+
+
+def make_feedback_suppressor():
+    return FeedbackSuppressor(
+        SAMPLE_RATE, FEEDBACK_DECIMATION, max_notches=FEEDBACK_MAX_NOTCHES,
+        max_depth_db=FEEDBACK_MAX_DEPTH_DB
+    )
+
+
+def feedback_loop(speech, howl_freq, suppressor, gain=3.5, room_gain=0.35):
+    """
+    Speech through an ULTRA-level gain into a room that resonates at
+    howl_freq, with the speaker output picked up again one block later.
+    Loop gain at howl_freq is gain * room_gain > 1, so it howls unless
+    the suppressor cuts it.
+    """
+    b, a = signal.iirpeak(howl_freq, 20, fs=SAMPLE_RATE)
+    b = b * room_gain
+    zi = np.zeros(2)
+    pickup = np.zeros(CHUNK_SIZE)
+    out = []
+
+    for i in range(0, len(speech) // CHUNK_SIZE * CHUNK_SIZE, CHUNK_SIZE):
+        block = np.clip((speech[i:i + CHUNK_SIZE] + pickup) * gain, -1.0, 1.0)
+        if suppressor:
+            block = suppressor.process(block)
+        out.append(block)
+        pickup, zi = signal.lfilter(b, a, block, zi=zi)
+
+    return np.concatenate(out)
+
+
+def tone_level_db(audio, freq, seconds=2.0):
+    """Level of one frequency over the last seconds of audio (dBFS)"""
+    tail = audio[-int(seconds * SAMPLE_RATE):]
+    t = np.arange(len(tail)) / SAMPLE_RATE
+    return 20 * np.log10(2 * np.abs(np.mean(tail * np.exp(-2j * np.pi * freq * t))) + 1e-12)
+
+
+def bench_feedback():
+    """Feedback suppressor cost, howl reduction and false notches on speech"""
+    print_header("FEEDBACK SUPPRESSION (DECIMATED DETECTOR + NOTCHES)")
+
+    budget = CHUNK_SIZE / SAMPLE_RATE
+    per_block = time_per_block(make_feedback_suppressor().process)
+    print(f"CPU: {per_block * 1e6:.1f} us/block ({per_block / budget:.2%} of one core)")
+
+    speech = synthetic_speech(20.0, SAMPLE_RATE) * 0.3
+    ok = True
+
+    print("\nHowl freq   Without    With      Reduction   Notches")
+    for howl_freq in [700, 2100, 4500]:
+        without = tone_level_db(feedback_loop(speech, howl_freq, None), howl_freq)
+        suppressor = make_feedback_suppressor()
+        with_suppression = tone_level_db(feedback_loop(speech, howl_freq, suppressor), howl_freq)
+        reduction = without - with_suppression
+
+        passed = reduction >= FEEDBACK_MIN_REDUCTION
+        ok = ok and passed
+        notches = ", ".join(f"{f} Hz {d} dB" for f, d in suppressor.get_stats()["notches"])
+        print(f"{howl_freq:6d} Hz {without:8.1f} {with_suppression:8.1f} dB "
+              f"{reduction:+8.1f} dB {'✅' if passed else '❌'}  {notches or '-'}")
+
+    # Speech alone must not be notched
+    suppressor = make_feedback_suppressor()
+    for i in range(0, len(speech) - CHUNK_SIZE, CHUNK_SIZE):
+        suppressor.process(speech[i:i + CHUNK_SIZE] * 3.5)
+    false_notches = suppressor.get_stats()["detections"]
+    ok = ok and false_notches == 0
+
+    print(f"\nFalse detections on 20 s of speech: {false_notches} "
+          f"{'✅' if false_notches == 0 else '❌'}")
+    print(f"Required reduction: {FEEDBACK_MIN_REDUCTION:.1f} dB")
+    return ok
+
+
+def bench_sample_formats():
+    """Device conversion cost and round-trip accuracy for every sample format"""
+    print_header("SAMPLE FORMATS: DEVICE BUFFER ROUND TRIP")
+    rng = np.random.default_rng(0)
+    audio = (rng.uniform(-0.9, 0.9, CHUNK_SIZE)).astype(np.float32)
+    budget = CHUNK_SIZE / SAMPLE_RATE
+    ok = True
+
+    # Previous pipeline: scale to float, int16 round trip, scale back, copy channel
+    indata = np.zeros((CHUNK_SIZE, 2), dtype=np.float32)
+    outdata = np.zeros_like(indata)
+
+    def legacy(block):
+        processed = indata[:, 0].astype(np.float32) / 32768.0
+        processed = (np.clip(processed, -0.99, 0.99) * 32767.0).astype(np.int16)
+        outdata[:, 0] = processed.astype(np.float32) / 32768.0
+        outdata[:, 1] = outdata[:, 0]
+
+    t_legacy = time_per_block(legacy)
+    print(f"\n{'Format':<10}{'Ch':>4}{'us/block':>10}{'CPU':>8}{'Max err LSB':>13}")
+    print(f"{'legacy':<10}{2:>4}{t_legacy * 1e6:>10.1f}{t_legacy / budget:>8.2%}{'-':>13}")
+
+    for dtype, (storage, full_scale) in FORMATS.items():
+        width = 3 if dtype == "int24" else 1
+        for channels in (1, 2):
+            converter = SampleFormat(dtype, channels, CHUNK_SIZE)
+            buffer = np.zeros((CHUNK_SIZE, channels * width), dtype=storage)
+
+            def round_trip(block):
+                converter.write(buffer, converter.read(buffer, CHUNK_SIZE), CHUNK_SIZE)
+
+            t_format = time_per_block(round_trip)
+
+            # Accuracy: write a known signal, read it back
+            converter.write(buffer, audio, CHUNK_SIZE)
+            restored = converter.read(buffer, CHUNK_SIZE)
+            lsb = 2.0 ** -23 if dtype == "float32" else 1.0 / full_scale
+            error = np.max(np.abs(restored - audio)) / lsb
+            ok = ok and error <= 1.0
+
+            print(f"{dtype:<10}{channels:>4}{t_format * 1e6:>10.1f}"
+                  f"{t_format / budget:>8.2%}{error:>13.2f}")
+
+    print(f"\n{'✅' if ok else '❌'} Round trip within 1 LSB for every format")
+    return ok
+
+
+def bench_soundboard(voices=8):
+    """Mixing many clips: one vectorized gather vs a loop over clips"""
+    print_header(f"SOUNDBOARD: {voices} CLIPS MIXED INTO THE VOICE")
+    from scipy.io import wavfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        # 44.1 kHz int16 sources so the library has to resample
+        rng = np.random.default_rng(0)
+        for i in range(voices):
+            clip = (rng.uniform(-0.5, 0.5, 44100 * 5) * 32767).astype(np.int16)
+            wavfile.write(os.path.join(directory, f"clip{i}.wav"), 44100, clip)
+
+        start = time.perf_counter()
+        library = ClipLibrary(directory, os.path.join(directory, ".cache"))
+        t_build = time.perf_counter() - start
+        start = time.perf_counter()
+        library = ClipLibrary(directory, os.path.join(directory, ".cache"))
+        t_map = time.perf_counter() - start
+
+        soundboard = Soundboard(library, max_voices=voices)
+        bank = library.bank
+        spans = list(bank.clips.values())
+        positions = [span[0] for span in spans]
+
+        def vectorized(block):
+            if soundboard.voices == 0:
+                for name in bank.clips:
+                    soundboard.play(name)
+            soundboard.mix(block, len(block))
+
+        def looped(block):
+            for i, (clip_start, clip_end) in enumerate(spans):
+                if positions[i] >= clip_end:
+                    positions[i] = clip_start
+                chunk = bank.samples[positions[i]:min(positions[i] + len(block), clip_end)]
+                block[:len(chunk)] += chunk * soundboard.gain
+                positions[i] += len(block)
+
+        # Same output for the same clips
+        soundboard.stop()
+        for name in bank.clips:
+            soundboard.play(name)
+        mixed = soundboard.mix(np.zeros(CHUNK_SIZE), CHUNK_SIZE)
+        reference = np.zeros(CHUNK_SIZE)
+        looped(reference)
+        error = np.max(np.abs(mixed - reference))
+
+        budget = CHUNK_SIZE / SAMPLE_RATE
+        t_looped = time_per_block(looped)
+        t_vectorized = time_per_block(vectorized)
+
+    print(f"\nBank build:      {t_build * 1e3:7.1f} ms (resample {voices} x 5 s clips)")
+    print(f"Bank map:        {t_map * 1e3:7.1f} ms (cached)")
+    print(f"Loop over clips: {t_looped * 1e6:7.1f} us/block ({t_looped / budget:.2%})")
+    print(f"Vectorized mix:  {t_vectorized * 1e6:7.1f} us/block ({t_vectorized / budget:.2%})")
+    print(f"Max difference:  {error:.2e}")
+
+    ok = error < 1e-6
+    print(f"\n{'✅' if ok else '❌'} Vectorized mix matches the per-clip loop")
+    return ok
+
+
+def paced(seconds, blocksize, work):
+    """Call work(i) every blocksize samples of real time, like a device clock"""
+    period = blocksize / SAMPLE_RATE
+    deadline = time.perf_counter()
+    for i in range(int(seconds / period)):
+        work(i)
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def bench_udp_stream(seconds=3.0, playout_blocksize=512, burst_blocks=2000):
+    """Localhost UDP stream: real-time latency, then raw throughput"""
+    print_header("NETWORK STREAM: UDP SINK -> JITTER BUFFER (LOCALHOST)")
+
+    speech = synthetic_speech(seconds, SAMPLE_RATE).astype(np.float32)
+    receiver = UdpReceiver(0, "127.0.0.1")
+    sink = UdpSink("127.0.0.1", receiver.port)
+
+    # Sender at the capture clock, playout at its own block size
+    received = []
+    player = threading.Thread(target=paced, args=(
+        seconds + 0.2, playout_blocksize,
+        lambda i: received.append(receiver.read(playout_blocksize))
+    ))
+    player.start()
+    paced(seconds, CHUNK_SIZE,
+          lambda i: sink.write(speech[i * CHUNK_SIZE:(i + 1) * CHUNK_SIZE]))
+    player.join()
+    sink.close()
+    stats = receiver.get_stats()
+    receiver.close()
+
+    # Received audio should be the sent audio, delayed and 16-bit quantized
+    output = np.concatenate(received)
+    sent = speech[:sink.packets * sink.frames_per_packet]
+    lag = int(np.argmax(signal.correlate(output, sent, 'valid', method='fft')))
+    overlap = min(len(sent), len(output) - lag)
+    error = np.max(np.abs(output[lag:lag + overlap] - sent[:overlap]))
+
+    # Unpaced: how fast can the sender thread push packets
+    receiver = UdpReceiver(0, "127.0.0.1")
+    sink = UdpSink("127.0.0.1", receiver.port, queue_blocks=burst_blocks)
+    block = speech[:CHUNK_SIZE]
+    start = time.perf_counter()
+    for _ in range(burst_blocks):
+        sink.write(block)
+    sink.close()
+    t_burst = time.perf_counter() - start
+    time.sleep(0.2)
+    burst = receiver.get_stats()
+    receiver.close()
+
+    packet_rate = SAMPLE_RATE / sink.frames_per_packet
+    packet_bytes = sink.bytes / sink.packets
+    print(f"\nPacket:          {sink.frames_per_packet} samples, {packet_bytes:.0f} bytes, "
+          f"{packet_rate:.0f}/s = {packet_bytes * packet_rate * 8 / 1e3:.0f} kbit/s")
+    print(f"Real time:       {stats['received']} packets, {stats['concealed']} concealed, "
+          f"{stats['trimmed']} trimmed, jitter {stats['jitter_ms']:.2f} ms, "
+          f"target {stats['target_packets']} packets")
+    print(f"Added latency:   p50 {stats['added_latency_p50_ms']:.1f} ms, "
+          f"p95 {stats['added_latency_p95_ms']:.1f} ms (jitter buffer + one packet)")
+    print(f"Write->playout:  p50 {stats['localhost_latency_p50_ms']:.1f} ms, "
+          f"p95 {stats['localhost_latency_p95_ms']:.1f} ms, "
+          f"max {stats['localhost_latency_max_ms']:.1f} ms (one clock, localhost only)")
+    print(f"Max difference:  {error:.2e} (16-bit quantization)")
+    print(f"Burst:           {sink.packets / t_burst:,.0f} packets/s "
+          f"({sink.bytes * 8 / t_burst / 1e6:.0f} Mbit/s), "
+          f"{burst['received'] / sink.packets:.1%} received "
+          f"({sink.packets / packet_rate / t_burst:.0f}x real time)")
+
+    ok = (stats["concealed"] == 0 and stats["trimmed"] == 0 and error < 1 / 32768
+          and stats["localhost_latency_p95_ms"] < 100)
+    print(f"\n{'✅' if ok else '❌'} Stream arrives complete and within 100 ms")
+    return ok
+
+
+def main():
+    """Run all benchmarks, False if any real-time limit is missed"""
+    bench_bass_multirate()
+    bench_fanout()
+    passed = bench_pitch_shifter()
+    passed = bench_denoiser() and passed
+    passed = bench_feedback() and passed
+    passed = bench_sample_formats() and passed
+    passed = bench_soundboard() and passed
+    passed = bench_udp_stream() and passed
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -10,21 +10,86 @@ API_HASH = "36495414098630fed4555734bcc9748b"  # YOUR_API_HASH_HERE
 # Bot Token (Get from @BotFather on Telegram)
 BOT_TOKEN = "8517043316:AAH31rVstixRMVolYwkShcqxiGCxi2kLD8s"  # YOUR_BOT_TOKEN_HERE
 
+# Telegram user IDs allowed to run admin commands (/profile)
+ADMIN_USER_IDS = []
+
 # Audio Settings
 SAMPLE_RATE = 48000  # Audio sample rate
 CHUNK_SIZE = 1024    # Audio chunk size
 CHANNELS = 1         # Mono audio
+BASS_DECIMATION = 16 # Bass path runs at SAMPLE_RATE / 16 (3 kHz)
+AUDIO_DTYPE = "float32"  # Device sample format: float32, int16, int24 or int32
+
+# CPU Budget Guard (load = callback time / block duration)
+CPU_GUARD_ENABLED = True
+CPU_GUARD_HIGH_LOAD = 0.7    # Step quality down above this load
+CPU_GUARD_LOW_LOAD = 0.3     # Step quality back up below this load
+CPU_GUARD_DOWN_BLOCKS = 5    # Overloaded blocks in a row before stepping down
+CPU_GUARD_UP_BLOCKS = 250    # Idle blocks in a row before stepping up (~5s)
+
+# Latency budget (latency_harness.py)
+LATENCY_BUDGET_MS = 150.0     # Max end-to-end delay (ITU-T G.114 one-way guideline)
+LATENCY_REGRESSION_MS = 2.0   # Max increase over the baseline report
+
+# Effect presets file, reloaded while running (see presets.py)
+PRESETS_FILE = "presets.json"
+PRESETS_POLL_SECONDS = 1.0
+
+# Soundboard clips (see soundboard.py)
+CLIPS_DIR = "clips"               # WAV files at any rate, resampled once to SAMPLE_RATE
+CLIP_CACHE_DIR = "clips/.cache"   # Memory-mapped clip bank
+CLIP_GAIN = 0.5                   # Clip level in the mix
+MAX_CLIP_VOICES = 8               # Clips playing at once - the oldest is cut beyond this
+
+# Effect previews (/preview, see preview.py)
+PREVIEW_SECONDS = 3.0              # Length of the reference phrase
+PREVIEW_PHRASE_FILE = "preview.wav"  # Recorded phrase - synthetic speech if missing
 
-# Voice Effects Configuration
+# Built-in voice effects, used when PRESETS_FILE is missing or invalid
 EFFECTS_CONFIG = {
     "normal": {"name": "Normal Voice", "gain": 1.0, "bass": 0.0, "treble": 0.0},
     "hige": {"name": "High Gain", "gain": 2.5, "bass": 0.7, "treble": 0.3},
     "ultra": {"name": "Ultra High", "gain": 3.5, "bass": 0.9, "treble": 0.5},
     "bass": {"name": "Bass Boost", "gain": 2.0, "bass": 1.2, "treble": 0.1},
     "clear": {"name": "Clear Voice", "gain": 2.2, "bass": 0.3, "treble": 0.8},
-    "robot": {"name": "Robot Voice", "gain": 2.5, "bass": 0.5, "treble": 0.9}
+    "robot": {"name": "Robot Voice", "gain": 2.5, "bass": 0.5, "treble": 0.9},
+    "chipmunk": {"name": "Chipmunk Voice", "gain": 2.0, "bass": 0.0, "treble": 0.0, "pitch": 7},
+    "deep": {"name": "Deep Voice", "gain": 2.5, "bass": 0.0, "treble": 0.0, "pitch": -5}
 }
 
+# Pitch shifter (STFT phase vocoder)
+PITCH_FRAME_SIZE = 1024  # FFT size - also the added latency in samples
+PITCH_HOP_SIZE = 256     # Analysis / synthesis hop
+
+# Noise suppression for CLEAR (STFT Wiener filter)
+DENOISE_FRAME_SIZE = 512  # FFT size - also the added latency in samples
+DENOISE_HOP_SIZE = 128    # Analysis / synthesis hop
+DENOISE_FLOOR_DB = -20.0  # Maximum attenuation per frequency bin
+
+# Feedback suppression (see feedback.py)
+FEEDBACK_ENABLED = True
+FEEDBACK_DECIMATION = 3        # Howling analysed at SAMPLE_RATE / 3 (16 kHz)
+FEEDBACK_MAX_NOTCHES = 6       # Notch filters available at once
+FEEDBACK_MAX_DEPTH_DB = -30.0  # Deepest cut of a single notch
+
+# Sampling profiler (/profile, see profiler.py)
+PROFILE_INTERVAL = 0.005     # Seconds between stack samples (200 Hz)
+PROFILE_MAX_SECONDS = 60     # Longest allowed profiling window
+PROFILE_TOP_N = 10           # Hot functions listed in chat
+PROFILE_DIR = "profiles"     # Collapsed-stack files for flame graph tools
+
+# Fan-out mode (see fanout.py): several presets rendered from one mic, each
+# to its own output device or udp:// target. When set, /startaudio starts
+# fan-out instead of the single duplex stream (styles normal/hige/ultra/bass)
+FANOUT_ROUTES = {}  # e.g. {"hige": "CABLE Input (VB-Audio Virtual Cable)", "bass": "udp://192.168.1.20:5004"}
+
+# Network streaming (see netstream.py)
+NET_OUTPUT = None            # e.g. "udp://192.168.1.20:5004" - also send processed audio there
+NET_PORT = 5004              # Receiver listen port
+NET_PACKET_FRAMES = 480      # Samples per packet (10 ms, ~1 KB - no IP fragmentation)
+NET_JITTER_MIN_PACKETS = 2   # Smallest jitter buffer target
+NET_JITTER_MAX_PACKETS = 50  # Largest jitter buffer (500 ms)
+
 # Virtual Audio Cable Settings (Windows)
 VB_CABLE_INPUT = "CABLE Input (VB-Audio Virtual Cable)"  # Virtual cable input name
 VB_CABLE_OUTPUT = "CABLE Output (VB-Audio Virtual Cable)"  # Virtual cable output name
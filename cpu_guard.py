@@ -0,0 +1,102 @@
+"""
+CPU GUARD - Callback Load Watchdog
+Steps effect quality down when audio_callback overruns its time budget
+"""
+
+from config import (
+    CPU_GUARD_HIGH_LOAD, CPU_GUARD_LOW_LOAD,
+    CPU_GUARD_DOWN_BLOCKS, CPU_GUARD_UP_BLOCKS
+)
+
+# Quality levels, cheapest last
+QUALITY_FULL = 0       # Full filter order, all passes
+QUALITY_REDUCED = 1    # Lower filter order
+QUALITY_NO_TREBLE = 2  # Lower filter order, treble pass skipped
+QUALITY_BYPASS = 3     # Effect bypassed, gain only
+
+QUALITY_NAMES = {
+    QUALITY_FULL: "FULL",
+    QUALITY_REDUCED: "REDUCED",
+    QUALITY_NO_TREBLE: "NO TREBLE",
+    QUALITY_BYPASS: "BYPASS"
+}
+
+# Weight of the newest block in the smoothed load
+LOAD_SMOOTHING = 0.2
+
+
+class CPUGuard:
+    """
+    Tracks callback load ratio (processing time / block duration)
+    and picks a quality level with hysteresis
+    """
+
+    def __init__(self, sample_rate,
+                 high_load=CPU_GUARD_HIGH_LOAD, low_load=CPU_GUARD_LOW_LOAD,
+                 down_blocks=CPU_GUARD_DOWN_BLOCKS, up_blocks=CPU_GUARD_UP_BLOCKS):
+        self.sample_rate = sample_rate
+        self.high_load = high_load
+        self.low_load = low_load
+        self.down_blocks = down_blocks
+        self.up_blocks = up_blocks
+        self.reset()
+
+    def reset(self):
+        """Return to full quality and clear all counters"""
+        self.level = QUALITY_FULL
+        self.load = 0.0
+        self.peak_load = 0.0
+        self.overruns = 0
+        self.steps_down = 0
+        self.steps_up = 0
+        self._over_blocks = 0
+        self._under_blocks = 0
+
+    def update(self, elapsed, frames):
+        """Record one callback and return the quality level to use next"""
+        ratio = elapsed / (frames / self.sample_rate)
+        self.load += LOAD_SMOOTHING * (ratio - self.load)
+        self.peak_load = max(self.peak_load, ratio)
+
+        if ratio > 1.0:
+            self.overruns += 1
+
+        # Count consecutive blocks outside the hysteresis band
+        if self.load > self.high_load:
+            self._over_blocks += 1
+            self._under_blocks = 0
+        elif self.load < self.low_load:
+            self._under_blocks += 1
+            self._over_blocks = 0
+        else:
+            self._over_blocks = 0
+            self._under_blocks = 0
+
+        if self._over_blocks >= self.down_blocks and self.level < QUALITY_BYPASS:
+            self._transition(self.level + 1)
+            self.steps_down += 1
+        elif self._under_blocks >= self.up_blocks and self.level > QUALITY_FULL:
+            self._transition(self.level - 1)
+            self.steps_up += 1
+
+        return self.level
+
+    def _transition(self, new_level):
+        """Switch quality level and log it"""
+        arrow = "⬇️" if new_level > self.level else "⬆️"
+        print(f"{arrow} CPU load {self.load:.0%} - quality "
+              f"{QUALITY_NAMES[self.level]} → {QUALITY_NAMES[new_level]}")
+        self.level = new_level
+        self._over_blocks = 0
+        self._under_blocks = 0
+
+    def get_stats(self):
+        """Get load and transition counters"""
+        return {
+            "quality": QUALITY_NAMES[self.level],
+            "load": self.load,
+            "peak_load": self.peak_load,
+            "overruns": self.overruns,
+            "steps_down": self.steps_down,
+            "steps_up": self.steps_up
+        }
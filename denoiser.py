@@ -0,0 +1,114 @@
+"""
+DENOISER - Streaming Spectral Noise Suppression
+Wiener filter with an adaptive noise-floor estimate, used by the CLEAR preset
+"""
+
+import time
+import numpy as np
+
+from stft import StreamingSTFT
+
+
+class SpectralDenoiser:
+    """
+    Streaming Wiener denoiser
+    Tracks the noise floor per bin with a rising minimum of the smoothed
+    power and applies a decision-directed Wiener gain, all bins at once
+    """
+
+    def __init__(self, sample_rate, frame_size=512, hop_size=128,
+                 floor_db=-20.0, noise_rise_db=3.0, smoothing=0.7, prior_weight=0.98):
+        self.sample_rate = sample_rate
+        self.stft = StreamingSTFT(self._denoise_frame, frame_size, hop_size)
+
+        # Lowest gain applied to any bin
+        self.floor = 10 ** (floor_db / 20)
+
+        # Noise floor may rise by noise_rise_db per second
+        self.rise = 10 ** (noise_rise_db / 10 * hop_size / sample_rate)
+
+        self.smoothing = smoothing
+        self.prior_weight = prior_weight
+
+        # Minimum tracking sits below the mean noise power
+        self.noise_bias = 1.5
+
+        # Bin power treated as digital silence, and how many frames a bin is
+        # seeded for - frames overlapping silence see only part of the noise
+        self.silence_power = 1e-10
+        self.seed_length = frame_size // hop_size
+
+        self.reset()
+
+    def reset(self):
+        """Forget the noise estimate and all stream state"""
+        self.stft.reset()
+        bins = self.stft.bins
+        self.smoothed_power = np.zeros(bins)
+        self.noise_floor = np.zeros(bins)
+        self.seed_frames = np.full(bins, self.seed_length)
+        self.last_clean_power = np.zeros(bins)
+        self.stft_reset_pending = False
+        self.blocks = 0
+        self.total_time = 0.0
+
+    def request_stft_reset(self):
+        """
+        Drop buffered audio before the next block, keeping the noise
+        estimate. Called when CLEAR is selected again; the reset runs in
+        process(), on the audio thread
+        """
+        self.stft_reset_pending = True
+
+    @property
+    def latency(self):
+        """Delay in samples added by the denoiser"""
+        return self.stft.latency
+
+    def _denoise_frame(self, spectrum):
+        """Apply the Wiener gain to one frame"""
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+
+        # Smoothed power and its slowly rising minimum
+        self.smoothed_power *= self.smoothing
+        self.smoothed_power += (1 - self.smoothing) * power
+        self.noise_floor *= self.rise
+        np.minimum(self.noise_floor, self.smoothed_power, out=self.noise_floor)
+
+        # A rising minimum never leaves 0, so bins that hit digital silence
+        # (stream start, muted mic) are seeded again from the coming frames
+        self.seed_frames[self.noise_floor < self.silence_power] = self.seed_length
+        seeding = self.seed_frames > 0
+        self.smoothed_power[seeding] = power[seeding]
+        self.noise_floor[seeding] = power[seeding]
+        self.seed_frames[seeding] -= 1
+
+        noise = self.noise_floor * self.noise_bias + 1e-12
+
+        # Decision-directed a priori SNR
+        posterior = power / noise
+        prior = (self.prior_weight * self.last_clean_power / noise
+                 + (1 - self.prior_weight) * np.maximum(posterior - 1, 0))
+        gain = np.maximum(prior / (1 + prior), self.floor)
+
+        self.last_clean_power = gain ** 2 * power
+        return spectrum * gain
+
+    def process(self, audio):
+        """Denoise one block"""
+        start = time.perf_counter()
+        if self.stft_reset_pending:
+            self.stft_reset_pending = False
+            self.stft.reset()
+            self.last_clean_power[:] = 0.0
+        out = self.stft.process(audio)
+        self.total_time += time.perf_counter() - start
+        self.blocks += 1
+        return out
+
+    def get_stats(self):
+        """CPU cost and added latency"""
+        return {
+            "cpu_us_per_block": self.total_time / self.blocks * 1e6 if self.blocks else 0.0,
+            "latency_ms": self.latency / self.sample_rate * 1000
+        }
@@ -0,0 +1,145 @@
+"""
+FAN-OUT - Several Presets From One Input
+Renders NORMAL, HIGE, ULTRA and BASS style presets together, computing
+shared filter passes once
+"""
+
+from scipy import signal
+import numpy as np
+
+from config import SAMPLE_RATE, BASS_DECIMATION
+from cpu_guard import QUALITY_REDUCED, QUALITY_NO_TREBLE, QUALITY_BYPASS
+from multirate import MultirateLowpass, switch_lowpass
+
+# Preset styles that can be derived from the shared stages
+FANOUT_STYLES = ("normal", "hige", "ultra", "bass")
+
+
+class FanoutRenderer:
+    """
+    Renders several presets from the same block
+
+    The bass and treble filters are linear, so for HIGE and BASS styles
+        bass(g * x) = g * bass(x)
+    and every such preset is a weighted sum of x, bass(x), treble(x) and
+    treble(bass(x)). Those stages are computed once per block and shared.
+    ULTRA compresses first, so it keeps its own bass path, but all treble
+    inputs are filtered together in one batched call.
+    """
+
+    def __init__(self, processor, effects):
+        presets = processor.presets
+        unknown = [
+            effect for effect in effects
+            if presets.get(effect, {}).get("style") not in FANOUT_STYLES
+        ]
+        if unknown:
+            raise ValueError(f"Effects not available in fan-out: {', '.join(unknown)}")
+
+        self.processor = processor
+        self.effects = list(effects)
+
+        # Stateful bass paths: one on the raw input, one per ULTRA preset,
+        # and whether each last ran its lite variant
+        self.bass_paths = {}
+        self.bass_lite = {}
+
+    @property
+    def gains(self):
+        """Final output gain of every rendered preset"""
+        presets = self.processor.presets
+        return {effect: presets[effect]["gain"] if effect in presets else 1.0
+                for effect in self.effects}
+
+    def _bass(self, key, audio):
+        """Stateful bass path at the processor's quality level"""
+        if key not in self.bass_paths:
+            self.bass_paths[key] = (
+                MultirateLowpass(4, 150, SAMPLE_RATE, BASS_DECIMATION),
+                MultirateLowpass(2, 150, SAMPLE_RATE, BASS_DECIMATION)
+            )
+        full, lite = self.bass_paths[key]
+        use_lite = self.processor.quality_level >= QUALITY_REDUCED
+        bass, other = (lite, full) if use_lite else (full, lite)
+        if use_lite != self.bass_lite.get(key, False):
+            # The other order sat idle - cross-fade to it from fresh state
+            self.bass_lite[key] = use_lite
+            return switch_lowpass(other, bass, audio)
+        return bass.process(audio)
+
+    def _treble(self, audio):
+        """Treble pass at the processor's quality level (filters along the last axis)"""
+        if self.processor.quality_level >= QUALITY_REDUCED:
+            sos = self.processor.lite_sos["treble"]
+        else:
+            sos = self.processor.treble_sos
+        return signal.sosfilt(sos, audio)
+
+    def render(self, audio):
+        """Render every requested preset from one block, before final gain"""
+        presets = self.processor.presets
+        quality = self.processor.quality_level
+        treble_enabled = quality < QUALITY_NO_TREBLE
+
+        # Presets removed by a reload render as plain input
+        active = {effect: presets[effect] for effect in self.effects
+                  if presets.get(effect, {}).get("style") in FANOUT_STYLES}
+        renders = {effect: audio for effect in self.effects if effect not in active}
+
+        if quality >= QUALITY_BYPASS:
+            # CPU budget exceeded - keep the preset gain only
+            renders.update({effect: audio * preset["gain"] for effect, preset in active.items()})
+            return renders
+
+        styles = {preset["style"] for preset in active.values()}
+        linear = "hige" in styles or "bass" in styles
+        ultra = [effect for effect, preset in active.items() if preset["style"] == "ultra"]
+
+        # Shared bass stage, plus each ULTRA preset's own on its compressed signal
+        if linear:
+            bass = self._bass("input", audio)
+        compressed = {}
+        ultra_bass = {}
+        for effect in ultra:
+            compressed[effect] = np.tanh(audio * active[effect]["gain"] * 1.5) / 1.5
+            ultra_bass[effect] = self._bass(effect, compressed[effect])
+
+        # Every treble input goes through a single batched filter call
+        ultra_treble = {}
+        if treble_enabled:
+            rows = ([audio, bass] if linear else []) + [compressed[effect] for effect in ultra]
+            if rows:
+                trebles = list(self._treble(np.vstack(rows)))
+                if linear:
+                    treble, treble_bass = trebles.pop(0), trebles.pop(0)
+                for effect in ultra:
+                    ultra_treble[effect] = trebles.pop(0)
+
+        for effect, preset in active.items():
+            style = preset["style"]
+            gain, bass_amount, treble_amount = preset["gain"], preset["bass"], preset["treble"]
+
+            if style == "normal":
+                renders[effect] = audio * gain
+
+            elif style == "hige":
+                # a = g*x + b*bass(g*x), out = a + t*treble(a)
+                out = gain * audio + gain * bass_amount * bass
+                if treble_enabled:
+                    out = out + treble_amount * gain * (treble + bass_amount * treble_bass)
+                renders[effect] = out
+
+            elif style == "bass":
+                # a = g*x + b*bass(g*x), out = t*treble(a)
+                if treble_enabled:
+                    renders[effect] = treble_amount * gain * (treble + bass_amount * treble_bass)
+                else:
+                    renders[effect] = treble_amount * gain * (audio + bass_amount * bass)
+
+            elif style == "ultra":
+                out = compressed[effect] + ultra_bass[effect] * bass_amount
+                if treble_enabled:
+                    out = out + ultra_treble[effect] * treble_amount
+                renders[effect] = out
+
+        return renders
@@ -0,0 +1,241 @@
+"""
+FEEDBACK - Acoustic Feedback Suppression
+Detects howling in the processed output on a decimated analysis path and
+cuts it with adaptive notch filters
+"""
+
+import time
+import numpy as np
+from scipy import signal
+
+
+def peaking_cut(freq, q, depth_db, fs):
+    """Peaking EQ biquad (RBJ cookbook) with depth_db of cut at freq, as one sos row"""
+    amplitude = 10 ** (depth_db / 40)
+    w0 = 2 * np.pi * freq / fs
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+
+    b = np.array([1 + alpha * amplitude, -2 * cos_w0, 1 - alpha * amplitude])
+    a = np.array([1 + alpha / amplitude, -2 * cos_w0, 1 - alpha / amplitude])
+    return np.concatenate((b / a[0], a / a[0]))
+
+
+class Notch:
+    """One adaptive notch: centre frequency, depth and time since last seen"""
+
+    def __init__(self, freq, depth_db):
+        self.freq = freq
+        self.depth_db = depth_db
+        self.idle_frames = 0
+
+
+class FeedbackSuppressor:
+    """
+    Streaming feedback detector with adaptive notches
+
+    Output is decimated and analysed once per hop. A bin is howling when
+    it is a narrow peak well above the spectrum average and its neighbours,
+    has no matching harmonics (unlike voiced speech), and stays put for
+    persist_frames analysis frames. Each howl gets a notch that deepens
+    while the peak persists and is released slowly once it is gone. All
+    notches run in one sos cascade whose state carries across blocks.
+    """
+
+    def __init__(self, sample_rate, decimation=3, fft_size=1024, max_notches=6,
+                 max_depth_db=-30.0, step_db=-6.0, q=30.0, papr_db=10.0, pnpr_db=15.0,
+                 phpr_db=10.0, min_level_db=-50.0, persist_frames=8, release_seconds=2.0,
+                 release_db=1.0):
+        self.sample_rate = sample_rate
+        self.decimation = decimation
+        self.analysis_rate = sample_rate / decimation
+        self.fft_size = fft_size
+        self.hop_size = fft_size // 2
+        self.bins = fft_size // 2 + 1
+        self.bin_hz = self.analysis_rate / fft_size
+
+        self.max_notches = max_notches
+        self.max_depth_db = max_depth_db
+        self.step_db = step_db
+        self.q = q
+        self.papr_db = papr_db
+        self.pnpr_db = pnpr_db
+        self.phpr_db = phpr_db
+        self.min_level_db = min_level_db
+        self.persist_frames = persist_frames
+
+        # Idle notches rise by release_db per release period, so a notch
+        # that is still needed is re-detected and deepened before it is gone
+        frame_seconds = self.hop_size / self.analysis_rate
+        self.release_frames = max(1, int(release_seconds / frame_seconds))
+        self.release_db = release_db
+
+        # Anti-alias filter for the analysis path - the cutoff is far enough
+        # from DC for a plain transfer function, which is cheaper to call
+        self.aa_b, self.aa_a = signal.butter(4, 0.8 * self.analysis_rate / 2, 'lowpass',
+                                             fs=sample_rate)
+
+        # Hann window, with the power of a full-scale sine's peak bin as 0 dB
+        self.window = signal.get_window('hann', fft_size)
+        self.full_scale_db = 20 * np.log10(np.sum(self.window) / 2)
+
+        # Bins far enough from DC and Nyquist for the neighbour test
+        self.search = slice(4, self.bins - 4)
+
+        self.reset()
+
+    def reset(self):
+        """Release every notch and clear all stream state"""
+        self.notches = []
+        self.sos = np.zeros((0, 6))
+        self.zi = np.zeros((0, 2))
+        self.aa_zi = np.zeros(len(self.aa_a) - 1)
+        self.phase = 0
+        self.frame = np.zeros(self.fft_size)
+        self.fill = 0
+        self.persistence = np.zeros(self.bins, dtype=np.int64)
+        self.detections = 0
+        self.blocks = 0
+        self.total_time = 0.0
+
+    def _rebuild(self):
+        """Recompute notch coefficients; filter state rows follow their notch"""
+        if self.notches:
+            self.sos = np.array([
+                peaking_cut(notch.freq, self.q, notch.depth_db, self.sample_rate)
+                for notch in self.notches
+            ])
+        else:
+            self.sos = np.zeros((0, 6))
+
+    def _find_howling(self, db, average_db):
+        """Bins of sustained narrow peaks in one analysis frame"""
+        k = np.arange(self.bins)[self.search]
+        peak = db[k]
+
+        # Narrow local maximum, loud enough to matter
+        candidate = (peak > db[k - 1]) & (peak >= db[k + 1]) & (peak > self.min_level_db)
+
+        # Peak-to-average power ratio
+        candidate &= peak - average_db > self.papr_db
+
+        # Peak-to-neighbour ratio, outside the window's main lobe
+        neighbours = np.maximum.reduce([db[k - 4], db[k - 3], db[k + 3], db[k + 4]])
+        candidate &= peak - neighbours > self.pnpr_db
+
+        # Peak-to-harmonic ratio: voiced speech has harmonics, howling does not
+        for multiple in (2, 3):
+            harmonic = np.minimum(k * multiple, self.bins - 1)
+            in_range = k * multiple < self.bins
+            candidate &= ~in_range | (peak - db[harmonic] > self.phpr_db)
+
+        # Persistence, allowing one bin of drift between frames
+        hit = np.zeros(self.bins, dtype=bool)
+        hit[k[candidate]] = True
+        hit[1:] |= hit[:-1].copy()
+        hit[:-1] |= hit[1:].copy()
+        self.persistence = np.where(hit, self.persistence + 1, 0)
+
+        howling = k[candidate & (self.persistence[k] >= self.persist_frames)]
+        return howling
+
+    def _peak_frequency(self, db, k):
+        """Peak frequency refined by parabolic interpolation"""
+        left, centre, right = db[k - 1], db[k], db[k + 1]
+        curvature = left - 2 * centre + right
+        offset = 0.5 * (left - right) / curvature if curvature < 0 else 0.0
+        return (k + offset) * self.bin_hz
+
+    def _analyse(self):
+        """Detect howling in the current frame and adapt the notches"""
+        spectrum = np.fft.rfft(self.frame * self.window)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        db = 10 * np.log10(power + 1e-20) - self.full_scale_db
+        average_db = 10 * np.log10(np.mean(power) + 1e-20) - self.full_scale_db
+
+        changed = False
+        seen = set()
+        for k in self._find_howling(db, average_db):
+            freq = self._peak_frequency(db, k)
+            notch = next((n for n in self.notches
+                          if abs(n.freq - freq) < 2 * self.bin_hz), None)
+
+            if notch is not None:
+                # Still howling through the notch - retune and deepen
+                notch.freq = freq
+                notch.depth_db = max(notch.depth_db + self.step_db, self.max_depth_db)
+            elif len(self.notches) < self.max_notches:
+                notch = Notch(freq, self.step_db)
+                self.notches.append(notch)
+                self.zi = np.vstack((self.zi, np.zeros((1, 2))))
+                print(f"🔇 Feedback at {freq:.0f} Hz - notch placed")
+            else:
+                # Out of notches - move the shallowest one
+                notch = max(self.notches, key=lambda n: n.depth_db)
+                notch.freq, notch.depth_db = freq, self.step_db
+                print(f"🔇 Feedback at {freq:.0f} Hz - notch moved")
+
+            notch.idle_frames = 0
+            seen.add(id(notch))
+            self.detections += 1
+            changed = True
+
+            # The notch needs time to act before it is judged again
+            self.persistence[max(k - 2, 0):k + 3] = 0
+
+        # Release notches whose peak has gone
+        for index in reversed(range(len(self.notches))):
+            notch = self.notches[index]
+            if id(notch) in seen:
+                continue
+            notch.idle_frames += 1
+            if notch.idle_frames < self.release_frames:
+                continue
+            notch.idle_frames = 0
+            notch.depth_db += self.release_db
+            changed = True
+            if notch.depth_db >= 0:
+                print(f"🔈 Feedback at {notch.freq:.0f} Hz gone - notch released")
+                del self.notches[index]
+                self.zi = np.delete(self.zi, index, axis=0)
+
+        if changed:
+            self._rebuild()
+
+    def process(self, audio):
+        """Notch one block and feed it to the analysis path"""
+        start = time.perf_counter()
+
+        if self.notches:
+            audio, self.zi = signal.sosfilt(self.sos, audio, zi=self.zi)
+
+        # Decimate the output for analysis, keeping phase across blocks
+        filtered, self.aa_zi = signal.lfilter(self.aa_b, self.aa_a, audio, zi=self.aa_zi)
+        decimated = filtered[self.phase::self.decimation]
+        self.phase = (self.phase - len(audio)) % self.decimation
+
+        hop = self.hop_size
+        offset = self.fft_size - hop
+        pos = 0
+        while pos < len(decimated):
+            take = min(hop - self.fill, len(decimated) - pos)
+            self.frame[offset + self.fill:offset + self.fill + take] = decimated[pos:pos + take]
+            self.fill += take
+            pos += take
+
+            if self.fill == hop:
+                self._analyse()
+                self.frame[:-hop] = self.frame[hop:]
+                self.fill = 0
+
+        self.blocks += 1
+        self.total_time += time.perf_counter() - start
+        return audio
+
+    def get_stats(self):
+        """Active notches and average cost"""
+        return {
+            "notches": [(round(n.freq), round(n.depth_db)) for n in self.notches],
+            "detections": self.detections,
+            "cpu_us_per_block": self.total_time / self.blocks * 1e6 if self.blocks else 0.0
+        }
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+LATENCY HARNESS - End-to-End Delay Measurement
+Injects probes through VoiceProcessor on a simulated duplex backend and
+reports algorithmic + buffering latency for every effect and blocksize
+
+Run: python latency_harness.py [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from scipy import signal
+
+from config import SAMPLE_RATE, PRESETS_FILE, LATENCY_BUDGET_MS, LATENCY_REGRESSION_MS
+from presets import load_presets_or_default
+from voice_enhancer import VoiceProcessor
+
+BLOCKSIZES = [256, 512, 1024, 2048]
+
+# Simulated device buffering on each side (ms)
+DEVICE_LATENCY_MS = 10.0
+
+# Silence before each probe so filters and spectral state settle
+SETTLE_SECONDS = 1.0
+
+# Probe amplitude (full scale = 1.0)
+PROBE_LEVEL = 0.5
+
+# Per-run report, and the committed baseline with the history of accepted runs
+REPORT_FILE = "latency_report.json"
+BASELINE_FILE = "latency_baseline.json"
+HISTORY_FILE = "latency_history.jsonl"
+
+# Filter cascades on each style's wet path
+STYLE_FILTERS = {
+    "hige": ["bass", "treble"], "ultra": ["bass", "treble"], "bass": ["bass", "treble"],
+    "clear": ["voice", "treble"], "robot": ["robot"], "pitch": [], "normal": []
+}
+
+# Where each cascade's group delay is taken: half the cutoff of the lowpass,
+# an octave above the highpass cutoff, the geometric centre of bandpasses
+FILTER_CENTRES_HZ = {"bass": 75.0, "treble": 6000.0, "voice": 1010.0, "robot": 1118.0}
+
+
+class SimulatedBackend:
+    """
+    Duplex stream stand-in: hands blocks to the processor exactly like the
+    sounddevice callback would, without touching any audio device
+
+    A duplex callback can only see a block once it is fully captured, and
+    its output only starts playing one block later, so buffering adds two
+    blocks plus the device latency on each side.
+    """
+
+    def __init__(self, processor, blocksize, device_latency_ms=DEVICE_LATENCY_MS):
+        self.processor = processor
+        self.blocksize = blocksize
+        self.device_latency_ms = device_latency_ms
+
+    @property
+    def buffering_ms(self):
+        """Capture + playback buffering in milliseconds"""
+        return 2 * self.blocksize / SAMPLE_RATE * 1000 + 2 * self.device_latency_ms
+
+    def run_block(self, block):
+        """Process one block through the stream callback, float32 in and out"""
+        indata = np.asarray(block, dtype=np.float32).reshape(-1, 1)
+        outdata = np.zeros_like(indata)
+        self.processor.audio_callback(indata, outdata, len(indata), None, None)
+        return outdata[:, 0]
+
+    def run(self, audio):
+        """Stream a whole signal through the processor block by block"""
+        pad = (-len(audio)) % self.blocksize
+        audio = np.concatenate((audio, np.zeros(pad)))
+        return np.concatenate([
+            self.run_block(audio[i:i + self.blocksize])
+            for i in range(0, len(audio), self.blocksize)
+        ])
+
+
+def impulse_delay(backend, tail_seconds=0.5):
+    """Samples from an impulse to the output peak"""
+    settle = int(SETTLE_SECONDS * SAMPLE_RATE)
+    probe = np.zeros(settle + int(tail_seconds * SAMPLE_RATE))
+    probe[settle] = PROBE_LEVEL
+
+    out = backend.run(probe)
+    return int(np.argmax(np.abs(out[settle:])))
+
+
+def filter_delay(processor, name):
+    """Group delay in samples of one filter cascade at its passband centre"""
+    freq = FILTER_CENTRES_HZ[name]
+    if name == "bass":
+        lowpass = processor.bass_multirate
+        _, delay = signal.group_delay((lowpass.b, lowpass.a), w=[freq],
+                                      fs=SAMPLE_RATE / lowpass.factor)
+        return delay[0] * lowpass.factor + lowpass.delay
+
+    w = 2 * np.pi * freq * np.array([0.999, 1.001]) / SAMPLE_RATE
+    _, response = signal.sosfreqz(getattr(processor, f"{name}_sos"), worN=w)
+    phase = np.unwrap(np.angle(response))
+    return -(phase[1] - phase[0]) / (w[1] - w[0])
+
+
+def chirp_delay(backend, seconds=0.5):
+    """Samples of delay from cross-correlating a voice-band chirp"""
+    settle = int(SETTLE_SECONDS * SAMPLE_RATE)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    chirp = signal.chirp(t, 200, seconds, 4000) * np.hanning(len(t)) * PROBE_LEVEL * 0.2
+    probe = np.concatenate((np.zeros(settle), chirp, np.zeros(settle)))
+
+    out = backend.run(probe)[settle:]
+    correlation = signal.correlate(out, chirp, mode='valid', method='fft')
+    return int(np.argmax(np.abs(correlation)))
+
+
+def measure(effects, blocksizes, probe="impulse", device_latency_ms=DEVICE_LATENCY_MS):
+    """Latency of every effect at every blocksize"""
+    results = []
+
+    for blocksize in blocksizes:
+        for effect in effects:
+            # Fresh processor so no state leaks between measurements
+            processor = VoiceProcessor()
+            processor.cpu_guard = None
+            processor.change_effect(effect)
+
+            # A chirp no longer correlates with itself after a pitch shift
+            if probe == "chirp" and processor.presets[effect]["style"] != "pitch":
+                measure_delay = chirp_delay
+            else:
+                measure_delay = impulse_delay
+
+            backend = SimulatedBackend(processor, blocksize, device_latency_ms)
+            algorithmic_ms = measure_delay(backend) / SAMPLE_RATE * 1000
+
+            # The peak follows the dry path of additive effects; the filtered
+            # part lags it by the slowest cascade's group delay
+            style = processor.presets[effect]["style"]
+            filter_ms = max((filter_delay(processor, name) for name in STYLE_FILTERS[style]),
+                            default=0.0) / SAMPLE_RATE * 1000
+
+            results.append({
+                "effect": effect,
+                "blocksize": blocksize,
+                "algorithmic_ms": round(algorithmic_ms, 3),
+                "filter_ms": round(filter_ms, 3),
+                "buffering_ms": round(backend.buffering_ms, 3),
+                "total_ms": round(algorithmic_ms + filter_ms + backend.buffering_ms, 3)
+            })
+
+    return results
+
+
+def print_report(results):
+    """Print results as a table"""
+    print("\n" + "=" * 60)
+    print("⏱️ LATENCY REPORT")
+    print("=" * 60)
+    print(f"{'Effect':<10}{'Block':>7}{'Peak ms':>10}{'Filter ms':>11}{'Buffer ms':>11}"
+          f"{'Total ms':>10}")
+    for row in results:
+        print(f"{row['effect']:<10}{row['blocksize']:>7}{row['algorithmic_ms']:>10.2f}"
+              f"{row['filter_ms']:>11.2f}{row['buffering_ms']:>11.2f}{row['total_ms']:>10.2f}")
+    print("Peak: impulse to output peak (dry path). Filter: group delay of the slowest")
+    print("filter cascade on the wet path. Total includes both plus buffering.")
+
+
+def check_regressions(results, baseline):
+    """Failures against the absolute budget and a previous report"""
+    failures = []
+    previous = {
+        (row["effect"], row["blocksize"]): row for row in baseline.get("results", [])
+    }
+
+    for row in results:
+        name = f"{row['effect']} @ {row['blocksize']}"
+        if row["total_ms"] > LATENCY_BUDGET_MS:
+            failures.append(
+                f"{name}: {row['total_ms']:.2f} ms over budget of {LATENCY_BUDGET_MS} ms"
+            )
+
+        old = previous.get((row["effect"], row["blocksize"]))
+        if old and row["total_ms"] - old["total_ms"] > LATENCY_REGRESSION_MS:
+            failures.append(
+                f"{name}: {old['total_ms']:.2f} → {row['total_ms']:.2f} ms "
+                f"(+{row['total_ms'] - old['total_ms']:.2f} ms)"
+            )
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure pipeline latency")
+    parser.add_argument("--effects", nargs="+", default=list(load_presets_or_default(PRESETS_FILE)),
+                        help="Effects to measure (default: all)")
+    parser.add_argument("--blocksizes", nargs="+", type=int, default=BLOCKSIZES)
+    parser.add_argument("--probe", choices=["impulse", "chirp"], default="impulse")
+    parser.add_argument("--device-latency-ms", type=float, default=DEVICE_LATENCY_MS)
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Report to compare against")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Make this run the new baseline if it passes")
+    parser.add_argument("--output", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    results = measure(args.effects, args.blocksizes, args.probe, args.device_latency_ms)
+    print_report(results)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sample_rate": SAMPLE_RATE,
+        "probe": args.probe,
+        "device_latency_ms": args.device_latency_ms,
+        "results": results
+    }
+
+    baseline = {}
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️ Baseline {args.baseline} not found, skipping comparison")
+
+    failures = check_regressions(results, baseline)
+
+    # A failed run must never replace the baseline it failed against
+    if failures and os.path.abspath(args.output) == os.path.abspath(args.baseline):
+        print(f"\n⚠️ Not overwriting baseline {args.baseline} with a failed run")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report saved to {args.output}")
+
+    if failures:
+        print("\n❌ LATENCY REGRESSIONS:")
+        for failure in failures:
+            print(f"  • {failure}")
+        return 1
+
+    if args.update_baseline:
+        # Baseline and history are committed, so accepted runs are tracked over time
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        with open(HISTORY_FILE, "a") as f:
+            f.write(json.dumps(report) + "\n")
+        print(f"📌 Baseline updated: {args.baseline} (history: {HISTORY_FILE})")
+
+    print("\n✅ Latency within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+LOAD TEST - Telegram Control Handlers Under Concurrent Users
+Drives the handlers registered in telegram_bot.py through a fake client and
+fake messages / callback queries, with no network, while a null-backend
+audio stream runs VoiceProcessor in real time
+
+Run: python load_test.py [--users 200] [--actions 20] [--api-latency-ms 50]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+
+from pyrogram.handlers import MessageHandler, CallbackQueryHandler
+
+from config import SAMPLE_RATE, CHUNK_SIZE
+from reference_audio import synthetic_speech
+import telegram_bot
+
+# Commands and button presses a virtual user picks from. Anything that opens
+# a real audio device (/startaudio, start_audio) is left out
+COMMANDS = [
+    "/start", "/menu", "/effects", "/gain", "/gain 3.5", "/status",
+    "/play", "/preview", "/preview hige", "/stopaudio", "/unknown"
+]
+STATIC_CALLBACKS = [
+    "menu_effects", "menu_gain", "menu_status", "menu", "menu_clips", "clips_stop",
+    "gain_1.0", "gain_2.5", "gain_5.0"
+]
+
+# Share of actions that are button presses rather than commands
+CALLBACK_SHARE = 0.7
+
+# Simulated Telegram API round trip for reply / answer / edit_text (ms)
+API_LATENCY_MS = 50.0
+
+# Event-loop lag probe interval (s)
+LAG_INTERVAL = 0.01
+
+# Null-backend run without load before the test, for reference (s)
+IDLE_SECONDS = 3.0
+
+REPORT_FILE = "load_report.json"
+
+
+# ===================== FAKE PYROGRAM OBJECTS =====================
+class FakeClient:
+    """Just enough of pyrogram.Client for filters and handlers"""
+
+    def __init__(self, app):
+        self.me = SimpleNamespace(username="loadtest_bot")
+        self.loop = asyncio.get_running_loop()
+        self.executor = app.executor
+        self.api_calls = 0
+
+    async def api_call(self, api_latency):
+        """Stand-in for a Telegram API request"""
+        self.api_calls += 1
+        if api_latency:
+            await asyncio.sleep(api_latency)
+
+
+class FakeMessage:
+    """Incoming message; replies and edits only cost a simulated round trip"""
+
+    def __init__(self, client, text, api_latency):
+        self.client = client
+        self.text = text
+        self.caption = None
+        self.command = None
+        self.api_latency = api_latency
+
+    async def reply(self, text, reply_markup=None, **kwargs):
+        await self.client.api_call(self.api_latency)
+        return FakeMessage(self.client, text, self.api_latency)
+
+    async def reply_audio(self, audio, **kwargs):
+        await self.client.api_call(self.api_latency)
+        sent = FakeMessage(self.client, None, self.api_latency)
+        sent.audio = SimpleNamespace(file_id=f"file-{self.client.api_calls}")
+        return sent
+
+    async def edit_text(self, text, reply_markup=None, **kwargs):
+        await self.client.api_call(self.api_latency)
+        self.text = text
+        return self
+
+
+class FakeCallbackQuery:
+    """Button press on a bot message"""
+
+    def __init__(self, client, data, api_latency):
+        self.client = client
+        self.data = data
+        self.api_latency = api_latency
+        self.message = FakeMessage(client, "🎛️ **Main Control Menu:**", api_latency)
+
+    async def answer(self, text=None, **kwargs):
+        await self.client.api_call(self.api_latency)
+
+
+# ===================== DISPATCH =====================
+class FakeDispatcher:
+    """
+    Runs updates through the app's registered handlers the way Pyrogram's
+    dispatcher does: a fixed pool of workers takes updates from one queue,
+    and each update goes to the first handler whose filters match
+    """
+
+    def __init__(self, app, client, workers):
+        self.app = app
+        self.client = client
+        self.workers = workers
+        self.queue = asyncio.Queue()
+        self.latencies = {}
+        self.errors = {}
+
+    @property
+    def handlers(self):
+        return [handler for group in self.app.dispatcher.groups.values() for handler in group]
+
+    async def dispatch(self, update):
+        """Pass one update to its handler, return the handler's name"""
+        handler_type = CallbackQueryHandler if isinstance(update, FakeCallbackQuery) else MessageHandler
+        for handler in self.handlers:
+            if isinstance(handler, handler_type) and await handler.check(self.client, update):
+                await handler.callback(self.client, update)
+                return handler.callback.__name__
+        return "unhandled"
+
+    async def worker(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                break
+            update, label, queued, done = item
+            start = time.perf_counter()
+            try:
+                await self.dispatch(update)
+            except Exception as e:
+                self.errors[label] = self.errors.get(label, 0) + 1
+                print(f"❌ {label}: {e}", file=sys.__stderr__)
+            finished = time.perf_counter()
+
+            # Total = queueing + handling, as a user would see it
+            self.latencies.setdefault(label, []).append((finished - queued, finished - start))
+            done.set()
+
+    async def submit(self, update, label):
+        """Queue an update and wait until it has been handled"""
+        done = asyncio.Event()
+        await self.queue.put((update, label, time.perf_counter(), done))
+        await done.wait()
+
+
+# ===================== NULL-BACKEND AUDIO STREAM =====================
+class NullBackendStream:
+    """
+    Calls processor.audio_callback in real time from its own thread, like a
+    sounddevice stream would, on synthetic speech and without any device.
+    Records callback durations and how late each block started.
+    """
+
+    def __init__(self, processor, blocksize=CHUNK_SIZE):
+        self.processor = processor
+        self.blocksize = blocksize
+        self.block_seconds = blocksize / SAMPLE_RATE
+        self.speech = synthetic_speech(10.0, SAMPLE_RATE).astype(np.float32) * 0.3
+        self._stop = threading.Event()
+        self._thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.durations = []
+        self.lateness = []
+
+    def start(self):
+        # Handlers see a running stream (clips are refused while stopped)
+        self.processor.is_processing = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.processor.is_processing = False
+
+    def _run(self):
+        indata = np.zeros((self.blocksize, 1), dtype=np.float32)
+        outdata = np.zeros((self.blocksize, 1), dtype=np.float32)
+        position = 0
+        deadline = time.perf_counter()
+
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            self.lateness.append(max(start - deadline, 0.0))
+
+            if position + self.blocksize > len(self.speech):
+                position = 0
+            indata[:, 0] = self.speech[position:position + self.blocksize]
+            position += self.blocksize
+
+            self.processor.audio_callback(indata, outdata, self.blocksize, None, None)
+            self.durations.append(time.perf_counter() - start)
+
+            # Next block is due one block period later; a late block does not
+            # shift the schedule, just like a device clock
+            deadline += self.block_seconds
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def get_stats(self):
+        """Callback cost and scheduling against the block period"""
+        durations = np.array(self.durations) * 1e3
+        lateness = np.array(self.lateness) * 1e3
+        if not len(durations):
+            return {}
+        block_ms = self.block_seconds * 1e3
+        return {
+            "blocks": len(durations),
+            "callback_p50_ms": round(float(np.percentile(durations, 50)), 3),
+            "callback_p99_ms": round(float(np.percentile(durations, 99)), 3),
+            "callback_max_ms": round(float(durations.max()), 3),
+            "late_p99_ms": round(float(np.percentile(lateness, 99)), 3),
+            "late_max_ms": round(float(lateness.max()), 3),
+            # A block that starts later than one period has missed the device
+            "deadline_misses": int(np.sum(durations + lateness > block_ms))
+        }
+
+
+# ===================== LOAD GENERATION =====================
+async def measure_loop_lag(samples, stop):
+    """Record how late the event loop wakes up a sleeping task"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(time.perf_counter() - start - LAG_INTERVAL, 0.0))
+
+
+async def virtual_user(dispatcher, client, actions, callbacks, think, api_latency, rng):
+    """One user sending commands and pressing buttons"""
+    for _ in range(actions):
+        if rng.random() < CALLBACK_SHARE:
+            data = rng.choice(callbacks)
+            label = f"callback:{data.split('_', 1)[0]}"
+            update = FakeCallbackQuery(client, data, api_latency)
+        else:
+            text = rng.choice(COMMANDS)
+            label = f"command:{text.split()[0]}"
+            update = FakeMessage(client, text, api_latency)
+
+        await dispatcher.submit(update, label)
+        if think:
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+
+
+def percentiles(values):
+    """p50 / p95 / p99 / max of seconds, in ms"""
+    ms = np.array(values) * 1e3
+    return {
+        "count": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3)
+    }
+
+
+async def run_load(args):
+    """Run the whole test on the bot's event loop"""
+    app = telegram_bot.app
+    processor = telegram_bot.voice_processor
+
+    # Let the app's pending add_handler tasks register every handler
+    await asyncio.sleep(0)
+
+    client = FakeClient(app)
+    dispatcher = FakeDispatcher(app, client, args.workers)
+    print(f"🧩 {len(dispatcher.handlers)} handlers registered")
+
+    callbacks = STATIC_CALLBACKS + [f"effect_{key}" for key in processor.presets]
+    callbacks += [f"preview_{key}" for key in processor.presets]
+    callbacks += [f"clip_{name}" for name in processor.soundboard.library.names]
+
+    # Reference: audio stream alone
+    stream = NullBackendStream(processor, args.blocksize)
+    stream.start()
+    print(f"🔈 Null-backend stream alone for {args.idle_seconds:.0f}s...")
+    await asyncio.sleep(args.idle_seconds)
+    idle = stream.get_stats()
+    stream.reset_stats()
+
+    print(f"🚀 {args.users} users x {args.actions} actions "
+          f"({args.workers} workers, {args.api_latency_ms:.0f} ms API round trip)...")
+    lag, stop = [], asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(lag, stop))
+    workers = [asyncio.create_task(dispatcher.worker()) for _ in range(args.workers)]
+
+    rng = random.Random(args.seed)
+    api_latency = args.api_latency_ms / 1000
+    think = args.think_ms / 1000
+
+    # Handlers print on every change - keep the report readable
+    output = sys.stdout if args.verbose else open(os.devnull, "w")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        await asyncio.gather(*[
+            virtual_user(dispatcher, client, args.actions, callbacks, think, api_latency,
+                         random.Random(rng.random()))
+            for _ in range(args.users)
+        ])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await lag_task
+    for _ in workers:
+        await dispatcher.queue.put(None)
+    await asyncio.gather(*workers)
+    stream.stop()
+    loaded = stream.get_stats()
+
+    all_total = [total for samples in dispatcher.latencies.values() for total, _ in samples]
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "users": args.users,
+        "actions_per_user": args.actions,
+        "workers": args.workers,
+        "api_latency_ms": args.api_latency_ms,
+        "think_ms": args.think_ms,
+        "elapsed_s": round(elapsed, 3),
+        "updates_per_s": round(len(all_total) / elapsed, 1),
+        "api_calls": client.api_calls,
+        "latency": percentiles(all_total),
+        "handlers": {
+            label: {
+                **percentiles([total for total, _ in samples]),
+                "handler_p99_ms": round(float(np.percentile([h for _, h in samples], 99)) * 1e3, 3),
+                "errors": dispatcher.errors.get(label, 0)
+            }
+            for label, samples in sorted(dispatcher.latencies.items())
+        },
+        "errors": sum(dispatcher.errors.values()),
+        "loop_lag": percentiles(lag) if lag else {},
+        "audio_idle": idle,
+        "audio_loaded": loaded
+    }
+
+
+def print_report(report):
+    """Print results as tables"""
+    print("\n" + "=" * 72)
+    print("📈 HANDLER LOAD REPORT")
+    print("=" * 72)
+    print(f"{report['users']} users, {report['latency']['count']} updates in "
+          f"{report['elapsed_s']:.1f}s ({report['updates_per_s']:.0f}/s), "
+          f"{report['api_calls']} API calls")
+
+    # Latency columns include queueing; "run p99" is time inside the handler
+    print(f"\n{'Handler':<22}{'Count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'run p99':>9}{'Errors':>8}")
+    for label, row in report["handlers"].items():
+        print(f"{label:<22}{row['count']:>7}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}{row['handler_p99_ms']:>9.1f}"
+              f"{row['errors']:>8}")
+    total = report["latency"]
+    print(f"{'ALL':<22}{total['count']:>7}{total['p50_ms']:>9.1f}{total['p95_ms']:>9.1f}"
+          f"{total['p99_ms']:>9.1f}{total['max_ms']:>9.1f}{'':>9}{report['errors']:>8}")
+
+    lag = report["loop_lag"]
+    if lag:
+        print(f"\n⏳ Event-loop lag: p50 {lag['p50_ms']:.2f} ms, p99 {lag['p99_ms']:.2f} ms, "
+              f"max {lag['max_ms']:.2f} ms")
+
+    print(f"\n{'Audio stream':<14}{'Blocks':>8}{'cb p50':>9}{'cb p99':>9}{'cb max':>9}"
+          f"{'late p99':>10}{'Misses':>8}")
+    for name in ("audio_idle", "audio_loaded"):
+        row = report[name]
+        print(f"{name[6:]:<14}{row['blocks']:>8}{row['callback_p50_ms']:>9.2f}"
+              f"{row['callback_p99_ms']:>9.2f}{row['callback_max_ms']:>9.2f}"
+              f"{row['late_p99_ms']:>10.2f}{row['deadline_misses']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Telegram control handlers")
+    parser.add_argument("--users", type=int, default=200, help="Concurrent virtual users")
+    parser.add_argument("--actions", type=int, default=20, help="Updates sent by each user")
+    parser.add_argument("--workers", type=int, default=telegram_bot.app.workers,
+                        help="Dispatcher workers (default: the app's)")
+    parser.add_argument("--api-latency-ms", type=float, default=API_LATENCY_MS)
+    parser.add_argument("--think-ms", type=float, default=100.0,
+                        help="Mean pause between a user's actions")
+    parser.add_argument("--blocksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--idle-seconds", type=float, default=IDLE_SECONDS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Keep handler output")
+    parser.add_argument("--output", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    # Same loop the handlers were registered on
+    report = telegram_bot.app.loop.run_until_complete(run_load(args))
+    print_report(report)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report saved to {args.output}")
+
+    if report["errors"]:
+        print(f"\n❌ {report['errors']} handler errors")
+        return 1
+    idle, loaded = report["audio_idle"], report["audio_loaded"]
+    if loaded["deadline_misses"] / loaded["blocks"] > idle["deadline_misses"] / idle["blocks"]:
+        print("\n⚠️ Audio stream missed deadlines under load")
+        return 1
+
+    print("\n✅ Handlers held up and the audio stream kept its deadlines")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+MULTIRATE - Decimated Low-Frequency Filtering
+Runs narrow lowpass filters at a reduced sample rate with state across blocks
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from scipy import signal
+
+
+class MultirateLowpass:
+    """
+    Lowpass filter evaluated at fs / factor
+    Decimates with a cascaded moving average, filters at the low rate,
+    then linearly interpolates back to the full rate
+    """
+
+    def __init__(self, order, cutoff, fs, factor, stages=2):
+        self.order = order
+        self.cutoff = cutoff
+        self.fs = fs
+        self.factor = factor
+        self.stages = stages
+
+        # Designed at the low rate, where the cutoff sits well away from DC
+        # and a plain transfer function is numerically safe
+        self.b, self.a = signal.butter(order, cutoff, 'lowpass', fs=fs / factor)
+
+        # Anti-alias weights: moving average of length factor, cascaded
+        weights = np.ones(1)
+        for _ in range(stages):
+            weights = np.convolve(weights, np.ones(factor) / factor)
+        self.weights = weights
+
+        # Interpolation indices per (block size, phase)
+        self._interp_cache = {}
+
+        self.reset()
+
+    def reset(self):
+        """Clear all filter state"""
+        # Low-rate filter state
+        self.zi = np.zeros(max(len(self.a), len(self.b)) - 1)
+
+        # Input samples still needed by the anti-alias window
+        self.history = np.zeros(len(self.weights) - 1)
+
+        # Offset of the next decimation point inside the next block
+        self.phase = 0
+
+        # Last two low-rate samples
+        self.prev_values = np.zeros(2)
+
+    @property
+    def delay(self):
+        """Extra delay in full-rate samples added by decimation + interpolation"""
+        return (len(self.weights) - 1) / 2 + self.factor
+
+    def _interp_index(self, n, phase):
+        """Neighbour indices and weights for linear interpolation"""
+        key = (n, phase)
+        if key not in self._interp_cache:
+            factor = self.factor
+            # Low-rate samples sit at phase - 2 * factor + i * factor, and the
+            # output lags one period so both neighbours are always known
+            offset = (np.arange(n) - factor) - (phase - 2 * factor)
+            index = offset // factor
+            frac = (offset - index * factor) / factor
+            self._interp_cache[key] = (index, frac)
+        return self._interp_cache[key]
+
+    def process(self, audio):
+        """Filter one block, carrying state into the next call"""
+        audio = np.asarray(audio, dtype=np.float64)
+        n = len(audio)
+        factor = self.factor
+        phase = self.phase
+        width = len(self.weights)
+
+        # Anti-alias + decimate: only evaluate the window at decimation points
+        padded = np.concatenate((self.history, audio))
+        self.history = padded[len(padded) - (width - 1):]
+        count = (n - phase + factor - 1) // factor
+        stride = padded.strides[0]
+        windows = as_strided(
+            padded[phase:], shape=(count, width), strides=(factor * stride, stride)
+        )
+        decimated = windows @ self.weights
+        self.phase = (phase - n) % factor
+
+        # Filter at the low rate (blocks shorter than one period may have
+        # no decimation point, and lfilter must not touch the state then)
+        if count > 0:
+            low, self.zi = signal.lfilter(self.b, self.a, decimated, zi=self.zi)
+        else:
+            low = decimated
+
+        # Interpolate back to the full rate
+        values = np.concatenate((self.prev_values, low))
+        index, frac = self._interp_index(n, phase)
+        left = values[index]
+        out = left + frac * (values[index + 1] - left)
+
+        self.prev_values = values[len(values) - 2:]
+
+        return out
+
+
+def switch_lowpass(old, new, audio):
+    """
+    First block after switching from filter old to filter new
+    new restarts from clean state and is faded in while old, whose state
+    is still current, finishes the block - no step at the switch
+    """
+    new.reset()
+    fade = np.linspace(0.0, 1.0, len(audio))
+    return old.process(audio) * (1 - fade) + new.process(audio) * fade
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+NETSTREAM - Processed Audio Over UDP
+Sends processed blocks as a compact RTP-like packet stream and plays it out
+on another machine through an adaptive jitter buffer
+
+Receive: python netstream.py [--port 5004] [--device N | --output call.wav]
+Send:    set NET_OUTPUT = "udp://<receiver-ip>:5004" in config.py
+"""
+
+import argparse
+from collections import deque
+import math
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+import wave
+import numpy as np
+import sounddevice as sd
+
+from config import (
+    SAMPLE_RATE, CHUNK_SIZE, NET_PORT, NET_PACKET_FRAMES,
+    NET_JITTER_MIN_PACKETS, NET_JITTER_MAX_PACKETS
+)
+
+# Header: version, payload type, sequence, sample timestamp, stream id,
+# sender clock (us, wraps) - RTP layout plus a send time, which only means
+# something to a receiver on the same machine (localhost latency tests)
+HEADER = struct.Struct("!BBHIII")
+VERSION = 0x80
+PAYLOAD_L16 = 96   # 16-bit big-endian PCM, mono, SAMPLE_RATE
+
+# Blocks waiting for the sender thread before new ones are dropped
+SEND_QUEUE_BLOCKS = 16
+
+
+def clock_us():
+    """Shared monotonic clock in microseconds, 32-bit wrapped"""
+    return int(time.perf_counter() * 1e6) & 0xFFFFFFFF
+
+
+def wrapped_diff(a, b, bits=32):
+    """a - b for counters that wrap at 2**bits"""
+    half = 1 << (bits - 1)
+    return ((a - b + half) % (1 << bits)) - half
+
+
+class UdpSink:
+    """
+    Output sink that streams blocks to a UdpReceiver
+
+    write() runs on the audio thread and only queues a copy; a dedicated
+    sender thread cuts the stream into fixed packets, quantizes them to
+    16-bit and sends them with sequence numbers.
+    """
+
+    def __init__(self, host, port, frames_per_packet=NET_PACKET_FRAMES,
+                 queue_blocks=SEND_QUEUE_BLOCKS):
+        # Resolved once - sendto() with a host name would look it up per packet
+        family, _, _, _, self.address = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+        self.frames_per_packet = frames_per_packet
+        self.socket = socket.socket(family, socket.SOCK_DGRAM)
+        self.ssrc = random.getrandbits(32)
+
+        self.queue = deque(maxlen=queue_blocks)
+        self.ready = threading.Event()
+        self.closed = False
+
+        self.sequence = 0
+        self.timestamp = 0
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.pending_time = 0
+
+        self.packets = 0
+        self.bytes = 0
+        self.dropped_blocks = 0
+        self.send_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="UdpSender", daemon=True)
+        self._thread.start()
+        print(f"📡 Streaming to udp://{host}:{port}")
+
+    def write(self, block):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped_blocks += 1
+        self.queue.append((clock_us(), np.array(block, dtype=np.float32)))
+        self.ready.set()
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+        self._thread.join()
+        self.socket.close()
+
+    def _run(self):
+        while not self.closed:
+            self.ready.wait(0.1)
+            self.ready.clear()
+            while self.queue:
+                written, block = self.queue.popleft()
+                self._send_block(written, block)
+
+    def _send_block(self, written, block):
+        """Packetize one block; leftover samples wait for the next block"""
+        frames = self.frames_per_packet
+        if len(self.pending):
+            audio = np.concatenate((self.pending, block))
+            # Packets are stamped with the write time of their first sample
+            stamp = self.pending_time
+        else:
+            audio, stamp = block, written
+
+        position = 0
+        while len(audio) - position >= frames:
+            self._send_packet(audio[position:position + frames], stamp)
+            position += frames
+            stamp = written
+
+        self.pending = audio[position:].copy()
+        self.pending_time = stamp
+
+    def _send_packet(self, samples, stamp):
+        pcm = np.rint(np.clip(samples, -1.0, 1.0 - 1 / 32768) * 32768).astype('>i2')
+        packet = HEADER.pack(VERSION, PAYLOAD_L16, self.sequence, self.timestamp,
+                             self.ssrc, stamp) + pcm.tobytes()
+        try:
+            self.socket.sendto(packet, self.address)
+            self.packets += 1
+            self.bytes += len(packet)
+        except OSError:
+            self.send_errors += 1
+
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.timestamp = (self.timestamp + len(samples)) & 0xFFFFFFFF
+
+    def get_stats(self):
+        return {
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "dropped_blocks": self.dropped_blocks,
+            "send_errors": self.send_errors
+        }
+
+
+class JitterBuffer:
+    """
+    Reorders packets and plays them out at the device clock
+
+    Interarrival jitter is tracked as in RFC 3550 and the target depth
+    follows it: enough packets to cover three times the jitter. Playout
+    starts once the target is buffered, missing packets are concealed
+    with silence, and a buffer that grows well past its target is trimmed
+    so latency comes back down after a burst.
+    """
+
+    def __init__(self, packet_frames=NET_PACKET_FRAMES, min_packets=NET_JITTER_MIN_PACKETS,
+                 max_packets=NET_JITTER_MAX_PACKETS, sample_rate=SAMPLE_RATE):
+        self.packet_frames = packet_frames
+        self.sample_rate = sample_rate
+        self.packet_seconds = packet_frames / sample_rate
+        self.min_packets = min_packets
+        self.max_packets = max_packets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the stream (new sender)"""
+        self.packets = {}
+        self.highest = None
+        self.next_sequence = None
+        self.buffering = True
+        self.current = None
+        self.offset = 0
+
+        self.jitter = 0.0
+        self.last_arrival = None
+        self.last_timestamp = None
+        self.target = self.min_packets
+
+        self.received = 0
+        self.late = 0
+        self.duplicates = 0
+        self.concealed = 0
+        self.underruns = 0
+        self.trimmed = 0
+        self.depths = deque(maxlen=10000)
+        self.clock_latencies = deque(maxlen=10000)
+
+    def _extend(self, sequence):
+        """16-bit sequence number to a running count"""
+        if self.highest is None:
+            self.highest = sequence
+            return sequence
+        extended = self.highest + wrapped_diff(sequence, self.highest & 0xFFFF, 16)
+        self.highest = max(self.highest, extended)
+        return extended
+
+    def put(self, sequence, timestamp, samples, sent_us, arrival_us):
+        """Add one packet (receiver thread)"""
+        with self.lock:
+            extended = self._extend(sequence)
+            if self.next_sequence is not None and extended < self.next_sequence:
+                self.late += 1
+                return
+            if extended in self.packets:
+                self.duplicates += 1
+                return
+            self.packets[extended] = (samples, sent_us)
+            self.received += 1
+
+            # Interarrival jitter against the media clock, so bursty
+            # packetization counts as jitter too
+            if self.last_arrival is not None:
+                spacing = (wrapped_diff(arrival_us, self.last_arrival) / 1e6
+                           - wrapped_diff(timestamp, self.last_timestamp) / self.sample_rate)
+                self.jitter += (abs(spacing) - self.jitter) / 16
+            self.last_arrival, self.last_timestamp = arrival_us, timestamp
+
+            needed = math.ceil(3 * self.jitter / self.packet_seconds) + self.min_packets
+            self.target = min(max(needed, self.min_packets), self.max_packets)
+
+            # Hard limit on memory and latency
+            while len(self.packets) > self.max_packets:
+                del self.packets[min(self.packets)]
+                self.trimmed += 1
+
+    def _next_packet(self, now_us):
+        """Samples of the next packet in sequence, or None on underrun"""
+        if not self.packets:
+            return None
+
+        if self.next_sequence is None or self.next_sequence < min(self.packets) - self.max_packets:
+            self.next_sequence = min(self.packets)
+
+        # Bring latency back down when far more is buffered than needed
+        if len(self.packets) > 2 * self.target + 2 and self.next_sequence in self.packets:
+            del self.packets[self.next_sequence]
+            self.next_sequence += 1
+            self.trimmed += 1
+
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        if sequence not in self.packets:
+            self.concealed += 1
+            return np.zeros(self.packet_frames, dtype=np.float32)
+
+        samples, sent_us = self.packets.pop(sequence)
+        self.depths.append(len(self.packets))
+        self.clock_latencies.append(wrapped_diff(now_us, sent_us) / 1e3)
+        return samples
+
+    def read(self, frames):
+        """Next frames samples for playout (device or file thread)"""
+        out = np.zeros(frames, dtype=np.float32)
+        with self.lock:
+            if self.buffering:
+                if len(self.packets) < self.target:
+                    return out
+                self.buffering = False
+
+            now_us = clock_us()
+            position = 0
+            while position < frames:
+                if self.current is None:
+                    self.current = self._next_packet(now_us)
+                    self.offset = 0
+                    if self.current is None:
+                        # Ran dry - refill to the target before playing again
+                        self.underruns += 1
+                        self.buffering = True
+                        break
+
+                take = min(frames - position, len(self.current) - self.offset)
+                out[position:position + take] = self.current[self.offset:self.offset + take]
+                position += take
+                self.offset += take
+                if self.offset == len(self.current):
+                    self.current = None
+        return out
+
+    def get_stats(self):
+        """
+        Counters plus added latency: packets buffered ahead at playout plus
+        one packet of packetization. localhost_latency compares sender and
+        receiver clocks, so it is only valid with both on one machine
+        """
+        with self.lock:
+            added = (np.array(self.depths) + 1) * self.packet_seconds * 1e3
+            clock = np.array(self.clock_latencies)
+            stats = {
+                "received": self.received,
+                "late": self.late,
+                "duplicates": self.duplicates,
+                "concealed": self.concealed,
+                "underruns": self.underruns,
+                "trimmed": self.trimmed,
+                "jitter_ms": round(self.jitter * 1e3, 3),
+                "target_packets": self.target,
+                "buffered_packets": len(self.packets)
+            }
+        for name, values in (("added_latency", added), ("localhost_latency", clock)):
+            if len(values):
+                stats[f"{name}_p50_ms"] = round(float(np.percentile(values, 50)), 3)
+                stats[f"{name}_p95_ms"] = round(float(np.percentile(values, 95)), 3)
+                stats[f"{name}_max_ms"] = round(float(values.max()), 3)
+        return stats
+
+
+class UdpReceiver:
+    """Receives a UdpSink stream into a jitter buffer"""
+
+    def __init__(self, port=NET_PORT, host="0.0.0.0", packet_frames=NET_PACKET_FRAMES):
+        family, _, _, _, address = socket.getaddrinfo(
+            host, port, type=socket.SOCK_DGRAM, flags=socket.AI_PASSIVE
+        )[0]
+        self.socket = socket.socket(family, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.socket.bind(address)
+        self.socket.settimeout(0.2)
+        self.port = self.socket.getsockname()[1]
+
+        self.buffer = JitterBuffer(packet_frames)
+        self.ssrc = None
+        self.bytes = 0
+        self.invalid = 0
+        self.closed = False
+
+        self._thread = threading.Thread(target=self._run, name="UdpReceiver", daemon=True)
+        self._thread.start()
+        print(f"📡 Listening on udp://{host}:{self.port}")
+
+    def _run(self):
+        while not self.closed:
+            try:
+                data, _ = self.socket.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            arrival = clock_us()
+
+            if len(data) <= HEADER.size:
+                self.invalid += 1
+                continue
+            version, payload, sequence, timestamp, ssrc, sent = HEADER.unpack_from(data)
+            if version != VERSION or payload != PAYLOAD_L16:
+                self.invalid += 1
+                continue
+
+            if ssrc != self.ssrc:
+                # Sender restarted - its sequence numbers start over
+                if self.ssrc is not None:
+                    print("🔄 New stream, resetting jitter buffer")
+                self.ssrc = ssrc
+                with self.buffer.lock:
+                    self.buffer.reset()
+
+            samples = np.frombuffer(data, dtype='>i2', offset=HEADER.size).astype(np.float32)
+            samples /= 32768.0
+            self.bytes += len(data)
+            self.buffer.put(sequence, timestamp, samples, sent, arrival)
+
+    def read(self, frames):
+        return self.buffer.read(frames)
+
+    def close(self):
+        self.closed = True
+        self._thread.join()
+        self.socket.close()
+
+    def get_stats(self):
+        return {**self.buffer.get_stats(), "bytes": self.bytes, "invalid": self.invalid}
+
+
+class DevicePlayout:
+    """Plays a receiver out on a local output device"""
+
+    def __init__(self, receiver, device=None, blocksize=CHUNK_SIZE):
+        self.receiver = receiver
+        self.stream = sd.OutputStream(
+            device=device,
+            channels=1,
+            samplerate=SAMPLE_RATE,
+            blocksize=blocksize,
+            dtype='float32',
+            callback=self._callback
+        )
+        self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        outdata[:, 0] = self.receiver.read(frames)
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
+
+
+class FilePlayout:
+    """Writes a receiver out to a 16-bit WAV file, paced like a device"""
+
+    def __init__(self, receiver, path, blocksize=CHUNK_SIZE):
+        self.receiver = receiver
+        self.blocksize = blocksize
+        self.file = wave.open(path, "wb")
+        self.file.setnchannels(1)
+        self.file.setsampwidth(2)
+        self.file.setframerate(SAMPLE_RATE)
+        self.closed = False
+        self._thread = threading.Thread(target=self._run, name="FilePlayout", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        period = self.blocksize / SAMPLE_RATE
+        deadline = time.perf_counter()
+        while not self.closed:
+            block = self.receiver.read(self.blocksize)
+            pcm = np.rint(np.clip(block, -1.0, 1.0 - 1 / 32768) * 32768).astype('<i2')
+            self.file.writeframes(pcm.tobytes())
+
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def close(self):
+        self.closed = True
+        self._thread.join()
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive a processed voice stream over UDP")
+    parser.add_argument("--port", type=int, default=NET_PORT)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--device", help="Output device (name or index, default: system output)")
+    parser.add_argument("--output", help="Write to this WAV file instead of a device")
+    parser.add_argument("--seconds", type=float, help="Stop after this long")
+    args = parser.parse_args()
+
+    receiver = UdpReceiver(args.port, args.host)
+    if args.output:
+        playout = FilePlayout(receiver, args.output)
+        print(f"💾 Writing to {args.output}")
+    else:
+        device = int(args.device) if args.device and args.device.isdigit() else args.device
+        playout = DevicePlayout(receiver, device)
+        print(f"🔊 Playing on {args.device or 'default output'}")
+
+    start = time.time()
+    try:
+        while args.seconds is None or time.time() - start < args.seconds:
+            time.sleep(min(5.0, args.seconds or 5.0))
+            stats = receiver.get_stats()
+            print(f"📊 {stats['received']} packets, jitter {stats['jitter_ms']:.1f} ms, "
+                  f"buffer {stats['buffered_packets']}/{stats['target_packets']}, "
+                  f"added latency p50 {stats.get('added_latency_p50_ms', 0):.1f} ms, "
+                  f"concealed {stats['concealed']}, underruns {stats['underruns']}")
+    except KeyboardInterrupt:
+        print("\n🛑 Receiver stopped by user")
+    finally:
+        playout.close()
+        receiver.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
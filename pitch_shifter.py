@@ -0,0 +1,113 @@
+"""
+PITCH SHIFTER - Phase-Vocoder Voice Effect
+Shifts voice pitch up or down in real time on top of the streaming STFT
+"""
+
+import numpy as np
+
+from stft import StreamingSTFT
+
+
+class PitchShifter:
+    """
+    Phase-vocoder pitch shifter (peak shifting)
+    Moves the region around every spectral peak by whole bins and rotates
+    its phase so the peak's true frequency is scaled by the pitch ratio
+    """
+
+    def __init__(self, semitones, frame_size=1024, hop_size=256):
+        self.semitones = semitones
+        self.ratio = 2.0 ** (semitones / 12.0)
+        self.stft = StreamingSTFT(self._shift_frame, frame_size, hop_size)
+
+        bins = self.stft.bins
+        self._bin_index = np.arange(bins)
+
+        # Phase advance per hop of a sinusoid centred in each bin
+        self.expected_advance = 2 * np.pi * hop_size * self._bin_index / frame_size
+
+        self.reset()
+
+    def reset(self):
+        """Clear phase tracking and overlap-add state"""
+        self.stft.reset()
+        self.last_phase = np.zeros(self.stft.bins)
+        self.rotation = np.zeros(self.stft.bins)
+        self.predecessor = None
+        self.reset_pending = False
+
+    def request_reset(self):
+        """
+        Reset before the next block. Called when the preset is selected
+        again: an idle shifter still holds audio from its last use. The
+        reset itself runs in process(), on the audio thread
+        """
+        self.reset_pending = True
+
+    def continue_from(self, previous):
+        """
+        Pick up previous's stream state on the next block, so a pitch change
+        does not restart the STFT with a frame of silence. The state is
+        copied by process(), on the audio thread, after previous's last block
+        """
+        self.predecessor = previous
+
+    def _take_over(self):
+        previous, self.predecessor = self.predecessor, None
+        stft, old = self.stft, previous.stft
+        stft.input_frame[:] = old.input_frame
+        stft.output_accum[:] = old.output_accum
+        stft.output_hop[:] = old.output_hop
+        stft.fill = old.fill
+        self.last_phase = previous.last_phase.copy()
+        self.rotation = previous.rotation.copy()
+
+    @property
+    def latency(self):
+        """Delay in samples added by the effect"""
+        return self.stft.latency
+
+    def _shift_frame(self, spectrum):
+        """Shift one frame's peaks to their new frequencies"""
+        bins = self.stft.bins
+        magnitude = np.abs(spectrum)
+        phase = np.angle(spectrum)
+
+        # Local maxima; every bin belongs to its nearest peak
+        peaks = np.nonzero(
+            (magnitude[1:-1] >= magnitude[:-2]) & (magnitude[1:-1] > magnitude[2:])
+        )[0] + 1
+        if len(peaks) == 0:
+            peaks = np.array([np.argmax(magnitude)])
+        region = np.searchsorted((peaks[:-1] + peaks[1:]) / 2, self._bin_index)
+
+        # True phase advance of each peak since the previous hop
+        deviation = phase[peaks] - self.last_phase[peaks] - self.expected_advance[peaks]
+        deviation -= 2 * np.pi * np.round(deviation / (2 * np.pi))
+        advance = self.expected_advance[peaks] + deviation
+        self.last_phase = phase
+
+        # Each peak lands on the nearest bin to its scaled frequency; the
+        # phase rotation accumulates the remaining frequency offset per hop
+        target = np.round(peaks * self.ratio).astype(int)
+        rotation = self.rotation[np.minimum(target, bins - 1)] + (self.ratio - 1) * advance
+        rotation = np.mod(rotation, 2 * np.pi)
+        self.rotation = np.zeros(bins)
+        inside = target < bins
+        self.rotation[target[inside]] = rotation[inside]
+
+        # Move every region rigidly with its peak, summing any overlaps
+        destination = self._bin_index + (target - peaks)[region]
+        valid = (destination >= 0) & (destination < bins)
+        moved = spectrum[valid] * np.exp(1j * rotation[region[valid]])
+        destination = destination[valid]
+        return (np.bincount(destination, moved.real, bins)
+                + 1j * np.bincount(destination, moved.imag, bins))
+
+    def process(self, audio):
+        """Pitch-shift one block"""
+        if self.reset_pending:
+            self.reset()
+        elif self.predecessor is not None:
+            self._take_over()
+        return self.stft.process(audio)
@@ -0,0 +1,178 @@
+"""
+PRESETS - Hot-Reloadable Effect Presets
+Loads presets from an external JSON file, validates and compiles them
+off the audio thread, and watches the file for changes
+"""
+
+import json
+import os
+import re
+import threading
+
+from config import EFFECTS_CONFIG, PITCH_FRAME_SIZE, PITCH_HOP_SIZE, PRESETS_POLL_SECONDS
+from pitch_shifter import PitchShifter
+
+# Processing chains a preset can use
+STYLES = ("normal", "hige", "ultra", "bass", "clear", "robot", "pitch")
+
+# Lowercase letters and digits only - "_" separates bot callback data
+PRESET_KEY = re.compile(r"[a-z0-9]+")
+
+# Keys end up in bot callback data, which Telegram caps at 64 bytes
+MAX_PRESET_KEY = 32
+
+# (field, default, minimum, maximum)
+NUMERIC_FIELDS = [
+    ("gain", 1.0, 0.1, 5.0),
+    ("bass", 0.0, 0.0, 5.0),
+    ("treble", 0.0, 0.0, 5.0)
+]
+PITCH_RANGE = 24
+
+
+def _number(key, field, value, low, high):
+    """Validate one numeric preset field"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+        raise ValueError(f"{key}: {field} must be a number between {low} and {high}")
+    return float(value)
+
+
+def validate_presets(data):
+    """Check raw preset data and return normalized presets, or raise ValueError"""
+    if not isinstance(data, dict) or not data:
+        raise ValueError("presets must be a non-empty JSON object")
+
+    presets = {}
+    for key, raw in data.items():
+        if not PRESET_KEY.fullmatch(key):
+            raise ValueError(f"{key}: preset names may only use lowercase letters and digits")
+        if len(key) > MAX_PRESET_KEY:
+            raise ValueError(f"{key}: preset names may be at most {MAX_PRESET_KEY} characters")
+        if not isinstance(raw, dict):
+            raise ValueError(f"{key}: preset must be a JSON object")
+
+        preset = dict(raw)
+        preset.setdefault("name", key.title())
+        for field in ("name", "emoji", "description"):
+            if field in preset and not isinstance(preset[field], str):
+                raise ValueError(f"{key}: {field} must be a string")
+
+        for field, default, low, high in NUMERIC_FIELDS:
+            preset[field] = _number(key, field, preset.get(field, default), low, high)
+
+        if "pitch" in preset:
+            preset["pitch"] = _number(key, "pitch", preset["pitch"], -PITCH_RANGE, PITCH_RANGE)
+
+        # Built-in names keep their own chain, others default by their fields
+        default_style = key if key in STYLES else ("pitch" if "pitch" in preset else "hige")
+        style = preset.setdefault("style", default_style)
+        if style not in STYLES:
+            raise ValueError(f"{key}: style must be one of {', '.join(STYLES)}")
+        if style == "pitch" and "pitch" not in preset:
+            raise ValueError(f"{key}: pitch style needs a 'pitch' value in semitones")
+
+        presets[key] = preset
+
+    return presets
+
+
+def load_presets(path):
+    """Read and validate a presets file"""
+    with open(path, encoding="utf-8") as f:
+        return validate_presets(json.load(f))
+
+
+def load_presets_or_default(path):
+    """Presets from path, falling back to config.EFFECTS_CONFIG"""
+    try:
+        return load_presets(path)
+    except FileNotFoundError:
+        print(f"⚠️ {path} not found - using built-in presets")
+    except ValueError as e:
+        print(f"❌ Invalid presets in {path}: {e} - using built-in presets")
+    return validate_presets(EFFECTS_CONFIG)
+
+
+class EffectBank:
+    """Validated presets plus the DSP objects compiled for them"""
+
+    def __init__(self, presets, pitch_shifters):
+        self.presets = presets
+        self.pitch_shifters = pitch_shifters
+
+
+def compile_presets(presets, previous=None):
+    """
+    Build an EffectBank
+    Pitch shifters whose settings did not change are reused so their
+    stream state carries over without a glitch; a changed pitch gets a new
+    shifter that continues the old one's frames
+    """
+    pitch_shifters = {}
+    for key, preset in presets.items():
+        if preset["style"] != "pitch":
+            continue
+        old = previous.pitch_shifters.get(key) if previous else None
+        if old is not None and old.semitones == preset["pitch"]:
+            pitch_shifters[key] = old
+        else:
+            pitch_shifters[key] = PitchShifter(preset["pitch"], PITCH_FRAME_SIZE, PITCH_HOP_SIZE)
+            if old is not None:
+                pitch_shifters[key].continue_from(old)
+    return EffectBank(presets, pitch_shifters)
+
+
+class PresetWatcher:
+    """
+    Polls the presets file on a background thread
+    Every valid change is handed to on_change(presets) from that thread;
+    invalid files are reported and the current presets stay active
+    """
+
+    def __init__(self, path, on_change, interval=PRESETS_POLL_SECONDS):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def start(self):
+        """Start watching"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"👀 Watching {self.path} for preset changes")
+
+    def stop(self):
+        """Stop watching"""
+        self._stop.set()
+
+    def _run(self):
+        last = self._mtime()
+        while not self._stop.wait(self.interval):
+            mtime = self._mtime()
+            if mtime is None or mtime == last:
+                continue
+            last = mtime
+            self.reload()
+
+    def reload(self):
+        """Load, validate and hand over the file's presets"""
+        try:
+            presets = load_presets(self.path)
+        except (OSError, ValueError) as e:
+            self.failures += 1
+            print(f"❌ Preset reload failed, keeping current presets: {e}")
+            return False
+
+        self.on_change(presets)
+        self.reloads += 1
+        return True
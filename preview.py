@@ -0,0 +1,102 @@
+"""
+PREVIEW - Effect Preview Clips
+Renders a reference phrase through every preset offline, in the background,
+and keeps the encoded results in memory for the bot to send
+"""
+
+import io
+import os
+import threading
+import numpy as np
+from scipy.io import wavfile
+
+from config import SAMPLE_RATE, PREVIEW_SECONDS, PREVIEW_PHRASE_FILE
+from reference_audio import synthetic_speech
+from soundboard import decode_wav
+from voice_enhancer import VoiceProcessor
+
+
+def reference_phrase():
+    """PREVIEW_PHRASE_FILE if present, otherwise synthetic speech"""
+    if os.path.exists(PREVIEW_PHRASE_FILE):
+        try:
+            audio = decode_wav(PREVIEW_PHRASE_FILE)
+            return audio[:int(PREVIEW_SECONDS * SAMPLE_RATE)]
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load {PREVIEW_PHRASE_FILE}: {e} - using synthetic speech")
+    return synthetic_speech(PREVIEW_SECONDS, SAMPLE_RATE).astype(np.float32)
+
+
+def encode_wav(audio):
+    """16-bit WAV bytes of a float signal"""
+    pcm = np.rint(np.clip(audio, -1.0, 1.0 - 1 / 32768) * 32768).astype(np.int16)
+    buffer = io.BytesIO()
+    wavfile.write(buffer, SAMPLE_RATE, pcm)
+    return buffer.getvalue()
+
+
+class Preview:
+    """One encoded preview; file_id is set once Telegram has stored it"""
+
+    def __init__(self, effect, name, data):
+        self.effect = effect
+        self.name = name
+        self.data = data
+        self.file_id = None
+
+    def file(self):
+        """Fresh file object for an upload"""
+        upload = io.BytesIO(self.data)
+        upload.name = f"preview_{self.effect}.wav"
+        return upload
+
+
+class PreviewCache:
+    """
+    Encoded previews of every preset
+
+    Rendering runs on a background thread with its own offline
+    VoiceProcessor per preset, so the live stream and its filter state are
+    never touched. A preset change clears the cache and starts a new
+    render; renders of outdated presets are thrown away.
+    """
+
+    def __init__(self):
+        self.previews = {}
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._phrase = None
+
+    def get(self, effect):
+        """Cached preview, or None while it is still rendering"""
+        return self.previews.get(effect)
+
+    def refresh(self, presets):
+        """Drop all previews and render presets in the background"""
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            self.previews = {}
+
+        thread = threading.Thread(
+            target=self._render, args=(dict(presets), generation), name="Preview", daemon=True
+        )
+        thread.start()
+
+    def _render(self, presets, generation):
+        if self._phrase is None:
+            self._phrase = reference_phrase()
+
+        for effect, preset in presets.items():
+            processor = VoiceProcessor(presets, realtime=False)
+            preview = Preview(effect, preset["name"], encode_wav(
+                processor.render_offline(self._phrase, effect)
+            ))
+
+            with self._lock:
+                if generation != self.generation:
+                    # Presets changed while rendering - a newer render took over
+                    return
+                self.previews[effect] = preview
+
+        print(f"👂 {len(presets)} effect previews ready")
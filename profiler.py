@@ -0,0 +1,255 @@
+"""
+PROFILER - On-Demand Sampling Profiler
+Samples the Python stacks of every thread for a bounded window, weights
+them by the CPU time each thread used, and writes collapsed stacks for
+flame graph tools
+"""
+
+from collections import Counter
+import os
+import random
+import sys
+import threading
+import time
+
+from config import PROFILE_INTERVAL, PROFILE_MAX_SECONDS
+
+# Leaf functions that mean a thread is waiting, not working. Only used
+# without per-thread CPU times: a thread blocked in a C call (time.sleep,
+# socket.recvfrom, SimpleQueue.get) shows its calling Python function
+IDLE_FUNCTIONS = {
+    "select", "poll", "wait", "_wait_for_tstate_lock", "sleep", "accept", "recv",
+    "recvfrom", "get", "_worker"
+}
+
+
+def thread_cpu_time(native_id):
+    """CPU seconds a thread has used (Linux /proc), None where unavailable"""
+    try:
+        with open(f"/proc/self/task/{native_id}/schedstat") as f:
+            return int(f.read().split()[0]) / 1e9
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler
+
+    A background thread snapshots sys._current_frames() every interval and
+    counts each thread's stack. Profiled threads run untouched: nothing is
+    installed in them and no lock is shared with them, so audio_callback
+    can at most wait for the GIL while one snapshot is taken.
+
+    Where the OS reports per-thread CPU time, every stack is also weighted
+    by the CPU its thread used since the previous sample, so threads
+    blocked in C calls count as idle whatever Python function they are in.
+    Elsewhere busy and idle are guessed from the innermost function name
+    and all counts are wall-clock.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, max_depth=64, thread_labels=None,
+                 native_ids=None):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.thread_labels = thread_labels
+        self.native_ids = native_ids
+
+        self.stacks = Counter()
+        self.cpu_stacks = Counter()
+        self.thread_cpu = Counter()
+        self._last_cpu = {}
+        self.samples = 0
+        self.sample_time = 0.0
+        self.seconds = 0.0
+        self.started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds):
+        """Sample for seconds (clamped to PROFILE_MAX_SECONDS) in the background"""
+        self.seconds = min(max(seconds, 1.0), PROFILE_MAX_SECONDS)
+        self.started = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="Profiler", daemon=True)
+        self._thread.start()
+        print(f"🔬 Profiling all threads for {self.seconds:.0f}s")
+        return self.seconds
+
+    def wait(self):
+        """Block until the sampling window is over"""
+        if self._thread:
+            self._thread.join()
+
+    def stop(self):
+        """End sampling early"""
+        self._stop.set()
+        self.wait()
+
+    def _run(self):
+        # The sampler needs the GIL to look at other threads. With the default
+        # 5 ms switch interval it only gets it once a short callback has
+        # finished, so every sample would land between callbacks
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.interval / 10))
+        try:
+            deadline = time.perf_counter() + self.seconds
+            while time.perf_counter() < deadline:
+                # Jittered so samples do not lock onto the audio block period
+                if self._stop.wait(random.uniform(0.5, 1.5) * self.interval):
+                    break
+                self.sample()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+    def _labels(self):
+        """Thread id -> readable name"""
+        labels = {thread.ident: thread.name for thread in threading.enumerate()}
+        if self.thread_labels:
+            labels.update(self.thread_labels())
+        return labels
+
+    def _cpu_times(self):
+        """Thread id -> CPU seconds, for threads the OS reports on"""
+        native = {thread.ident: thread.native_id for thread in threading.enumerate()}
+        if self.native_ids:
+            # Threads started outside Python, like the PortAudio callback
+            native.update(self.native_ids())
+        times = {}
+        for ident, native_id in native.items():
+            cpu = thread_cpu_time(native_id)
+            if cpu is not None:
+                times[ident] = cpu
+        return times
+
+    @property
+    def cpu_weighted(self):
+        """Whether stacks carry CPU time, rather than wall-clock counts only"""
+        return bool(self.thread_cpu) or bool(self._last_cpu)
+
+    def sample(self):
+        """Count the current stack of every other thread"""
+        start = time.perf_counter()
+        own = threading.get_ident()
+        labels = self._labels()
+        cpu_times = self._cpu_times()
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            key = (labels.get(ident, f"thread-{ident}"), tuple(stack))
+            self.stacks[key] += 1
+
+            # CPU used since the last sample is charged to the current stack
+            if ident in cpu_times:
+                cpu = cpu_times[ident]
+                used = cpu - self._last_cpu.get(ident, cpu)
+                self._last_cpu[ident] = cpu
+                self.cpu_stacks[key] += used
+                self.thread_cpu[key[0]] += used
+
+        self.samples += 1
+        self.sample_time += time.perf_counter() - start
+
+    @staticmethod
+    def _frame_name(frame):
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def collapsed(self):
+        """Stacks as 'thread;outer;...;inner count' lines, hottest first"""
+        return [
+            ";".join([label] + [self._frame_name(frame) for frame in stack]) + f" {count}"
+            for (label, stack), count in self.stacks.most_common()
+        ]
+
+    def save(self, directory):
+        """Write the collapsed stacks, return the file path"""
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        path = os.path.join(directory, f"profile-{stamp}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        print(f"💾 Profile saved to {path}")
+        return path
+
+    def thread_samples(self):
+        """Samples per thread, split into busy and idle by leaf function (wall-clock)"""
+        threads = {}
+        for (label, stack), count in self.stacks.items():
+            busy, idle = threads.get(label, (0, 0))
+            if stack and stack[-1][0] in IDLE_FUNCTIONS:
+                idle += count
+            else:
+                busy += count
+            threads[label] = (busy, idle)
+        return threads
+
+    def _busy_stacks(self):
+        """(label, stack) -> weight of busy time: CPU seconds, or wall-clock samples"""
+        if self.cpu_weighted:
+            return {key: used for key, used in self.cpu_stacks.items() if used > 0}
+        return {(label, stack): count for (label, stack), count in self.stacks.items()
+                if stack and stack[-1][0] not in IDLE_FUNCTIONS}
+
+    def top_functions(self, n=10):
+        """(function, self %, total %) of the busiest functions over busy time"""
+        self_counts, total_counts = Counter(), Counter()
+        busy = 0
+        for (label, stack), weight in self._busy_stacks().items():
+            if not stack:
+                continue
+            busy += weight
+            self_counts[stack[-1]] += weight
+            for frame in set(stack):
+                total_counts[frame] += weight
+
+        if not busy:
+            return []
+        return [
+            (self._frame_name(frame), count / busy, total_counts[frame] / busy)
+            for frame, count in self_counts.most_common(n)
+        ]
+
+    def summary(self, n=10):
+        """Chat-sized report"""
+        overhead = self.sample_time / self.seconds if self.seconds else 0.0
+        lines = [
+            f"🔬 **PROFILE** ({self.seconds:.0f}s, {self.samples} samples, "
+            f"overhead {overhead:.1%})",
+            ""
+        ]
+
+        if self.cpu_weighted:
+            lines.append("**Threads (CPU time, share of one core):**")
+            samples = self.thread_samples()
+            for label in sorted(samples, key=lambda label: -self.thread_cpu[label]):
+                if label in self.thread_cpu:
+                    used = self.thread_cpu[label]
+                    lines.append(f"• {label}: {used * 1e3:.0f} ms ({used / self.seconds:.1%})")
+                else:
+                    lines.append(f"• {label}: no CPU data")
+            lines += ["", f"**Top {n} functions (self / total of CPU time):**"]
+        else:
+            lines.append("**Threads (busy / idle samples, wall-clock):**")
+            for label, (busy, idle) in sorted(self.thread_samples().items(),
+                                              key=lambda item: -item[1][0]):
+                lines.append(f"• {label}: {busy} / {idle}")
+            lines += ["", f"**Top {n} functions (self / total of busy wall-clock samples):**"]
+
+        top = self.top_functions(n)
+        if not top:
+            lines.append("• no busy samples")
+        for name, self_share, total_share in top:
+            lines.append(f"• {self_share:5.1%} / {total_share:5.1%}  `{name}`")
+        return "\n".join(lines)
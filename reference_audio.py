@@ -0,0 +1,49 @@
+"""
+REFERENCE AUDIO - Synthetic Test Signals
+Speech-like material for offline checks without shipping recordings
+"""
+
+import numpy as np
+from scipy import signal
+
+# Formant centre frequencies of a few vowels (Hz)
+VOWEL_FORMANTS = [
+    (730, 1090, 2440),   # a
+    (270, 2290, 3010),   # i
+    (300, 870, 2240),    # u
+    (530, 1840, 2480),   # e
+    (570, 840, 2410)     # o
+]
+
+
+def synthetic_speech(seconds, sample_rate, seed=0):
+    """
+    Voiced syllables with pauses: a glottal pulse train with a gliding
+    pitch, shaped by vowel formants and a syllable envelope
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    out = np.zeros(n)
+
+    pos = int(0.1 * sample_rate)
+    while pos < n:
+        length = int(rng.uniform(0.15, 0.35) * sample_rate)
+        end = min(pos + length, n)
+        length = end - pos
+        t = np.arange(length) / sample_rate
+
+        # Glottal pulses from a gliding fundamental
+        f0 = rng.uniform(110, 220) * (1 + 0.15 * np.sin(2 * np.pi * rng.uniform(1, 3) * t))
+        phase = np.cumsum(f0) / sample_rate
+        pulses = np.diff(np.floor(phase), prepend=0.0)
+
+        # Vowel formants
+        voiced = np.zeros(length)
+        for freq in VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))]:
+            b, a = signal.iirpeak(freq, freq / 80, fs=sample_rate)
+            voiced += signal.lfilter(b, a, pulses)
+
+        out[pos:end] = voiced * np.hanning(length) * rng.uniform(0.5, 1.0)
+        pos = end + int(rng.uniform(0.05, 0.2) * sample_rate)
+
+    return out / (np.max(np.abs(out)) + 1e-12) * 0.5
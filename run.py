@@ -99,7 +99,7 @@ def print_instructions():
     ⚠️  TROUBLESHOOTING:
     • No sound? Check VB-Cable settings
     • Bot not responding? Check API credentials
-    • Echo? Use /gain 2.0
+    • Echo/howling? Feedback is notched automatically - if it persists use /gain 2.0
     """
     
     print(instructions)
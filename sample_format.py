@@ -0,0 +1,105 @@
+"""
+SAMPLE FORMAT - Device Sample Conversion
+Moves audio between device buffers (int16/int24/int32/float32) and the
+float processing chain, on views of the device buffers where possible
+"""
+
+import numpy as np
+
+# dtype name -> (numpy storage type, full-scale value)
+FORMATS = {
+    "float32": (np.float32, 1.0),
+    "int16": (np.int16, 32768.0),
+    "int24": (np.uint8, 8388608.0),    # packed little-endian, 3 bytes per sample
+    "int32": (np.int32, 2147483648.0)
+}
+
+
+class SampleFormat:
+    """
+    Converts one device sample format
+
+    float32 input is returned as a zero-copy view of the device buffer,
+    integer input is scaled into a preallocated float buffer, and output
+    is quantized exactly once, straight into the device buffer.
+    """
+
+    def __init__(self, dtype, channels=1, blocksize=1024):
+        if dtype not in FORMATS:
+            raise ValueError(f"Unsupported sample format: {dtype}")
+
+        self.dtype = dtype
+        self.channels = channels
+        self.storage, self.full_scale = FORMATS[dtype]
+        self.is_float = dtype == "float32"
+        self._allocate(blocksize)
+
+    def _allocate(self, frames):
+        """(Re)allocate work buffers for blocks of up to frames samples"""
+        self.capacity = frames
+        self._float = np.empty(frames, dtype=np.float32)
+        self._scaled = np.empty(frames, dtype=np.float64)
+        self._packed = np.zeros((frames, 4), dtype=np.uint8)
+
+    def _ensure(self, frames):
+        if frames > self.capacity:
+            self._allocate(frames)
+
+    def _samples(self, buffer, frames):
+        """Device buffer as a (frames, channels) array, without copying"""
+        if isinstance(buffer, np.ndarray):
+            return buffer
+        # Raw streams hand over plain buffers
+        width = 3 if self.dtype == "int24" else np.dtype(self.storage).itemsize
+        raw = np.frombuffer(buffer, dtype=np.uint8).reshape(frames, self.channels * width)
+        if self.dtype == "int24":
+            return raw
+        return raw.view(self.storage)
+
+    def read(self, indata, frames):
+        """First channel of indata as float32 in [-1, 1)"""
+        samples = self._samples(indata, frames)
+
+        if self.is_float:
+            return samples[:, 0]
+
+        self._ensure(frames)
+        out = self._float[:frames]
+
+        if self.dtype == "int24":
+            # Place the 3 bytes in the top of an int32, shift back with sign
+            packed = self._packed[:frames]
+            packed[:, 1:] = samples[:, 0:3]
+            np.multiply(packed.view(np.int32)[:, 0] >> 8, 1.0 / self.full_scale, out=out)
+        else:
+            np.multiply(samples[:, 0], 1.0 / self.full_scale, out=out)
+        return out
+
+    def write(self, outdata, audio, frames):
+        """Quantize processed audio once into every channel of outdata"""
+        samples = self._samples(outdata, frames)
+
+        if self.is_float:
+            np.clip(audio, -1.0, 1.0, out=samples[:, 0])
+        else:
+            self._ensure(frames)
+            scaled = self._scaled[:frames]
+            np.multiply(audio, self.full_scale, out=scaled)
+            np.clip(scaled, -self.full_scale, self.full_scale - 1, out=scaled)
+            np.rint(scaled, out=scaled)
+
+            if self.dtype == "int24":
+                packed = self._packed[:frames]
+                ints = packed.view(np.int32)[:, 0]
+                np.copyto(ints, scaled, casting='unsafe')
+                np.left_shift(ints, 8, out=ints)
+                samples[:, 0:3] = packed[:, 1:]
+            else:
+                np.copyto(samples[:, 0], scaled, casting='unsafe')
+
+        # Duplicate to the remaining output channels
+        if self.dtype == "int24":
+            for channel in range(1, self.channels):
+                samples[:, channel * 3:channel * 3 + 3] = samples[:, 0:3]
+        elif samples.shape[1] > 1:
+            samples[:, 1:] = samples[:, :1]
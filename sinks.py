@@ -0,0 +1,70 @@
+"""
+SINKS - Output Destinations for Processed Audio
+Anything with write(block) / close() can receive processed blocks
+"""
+
+from collections import deque
+import numpy as np
+import sounddevice as sd
+
+from netstream import UdpSink
+
+
+class CallbackSink:
+    """Hands every processed block to a Python callable"""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, block):
+        self.callback(block)
+
+    def close(self):
+        pass
+
+
+class DeviceSink:
+    """
+    Plays processed blocks on an output device through its own stream
+    A short queue absorbs clock drift; on underrun it plays silence
+    """
+
+    def __init__(self, device, samplerate, blocksize, queue_blocks=4):
+        self.queue = deque(maxlen=queue_blocks)
+        self.underruns = 0
+        self.stream = sd.OutputStream(
+            device=device,
+            channels=1,
+            samplerate=samplerate,
+            blocksize=blocksize,
+            dtype='float32',
+            callback=self._callback
+        )
+        self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        """Feed the device from the queue"""
+        if self.queue and len(self.queue[0]) == frames:
+            outdata[:, 0] = self.queue.popleft()
+        else:
+            outdata.fill(0)
+            self.underruns += 1
+
+    def write(self, block):
+        self.queue.append(np.array(block, dtype=np.float32))
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
+
+
+def make_sink(target, samplerate, blocksize):
+    """Sink for a route target: an existing sink, a callable, udp://host:port or a device"""
+    if hasattr(target, "write"):
+        return target
+    if callable(target):
+        return CallbackSink(target)
+    if isinstance(target, str) and target.startswith("udp://"):
+        host, _, port = target[len("udp://"):].rpartition(":")
+        return UdpSink(host.strip("[]"), int(port))
+    return DeviceSink(target, samplerate, blocksize)
@@ -0,0 +1,285 @@
+"""
+SOUNDBOARD - Clips Mixed Into the Live Output
+Keeps a library of jingles resampled to SAMPLE_RATE in one memory-mapped
+bank and mixes every playing clip into the processed voice
+"""
+
+from collections import deque
+import hashlib
+import json
+import os
+import re
+import threading
+from math import gcd
+import numpy as np
+from scipy import signal
+from scipy.io import wavfile
+
+from config import SAMPLE_RATE, CHUNK_SIZE, CLIPS_DIR, CLIP_CACHE_DIR, CLIP_GAIN, MAX_CLIP_VOICES
+
+# Integer WAV types -> full-scale value (uint8 is offset binary)
+WAV_SCALE = {np.dtype(np.int16): 32768.0, np.dtype(np.int32): 2147483648.0}
+
+# Clip names end up in bot callback data, keep them short and plain
+MAX_CLIP_NAME = 32
+
+
+def clip_key(filename):
+    """Clip name for a file: lowercase letters and digits of its stem"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return re.sub(r"[^a-z0-9]", "", stem.lower())[:MAX_CLIP_NAME]
+
+
+def decode_wav(path):
+    """Mono float32 samples of a WAV file at SAMPLE_RATE"""
+    rate, data = wavfile.read(path)
+
+    if data.dtype == np.uint8:
+        audio = (data.astype(np.float32) - 128.0) / 128.0
+    elif data.dtype in WAV_SCALE:
+        audio = data.astype(np.float32) / WAV_SCALE[data.dtype]
+    else:
+        audio = data.astype(np.float32)
+
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+
+    if rate != SAMPLE_RATE:
+        divisor = gcd(rate, SAMPLE_RATE)
+        audio = signal.resample_poly(audio, SAMPLE_RATE // divisor, rate // divisor)
+
+    return audio.astype(np.float32)
+
+
+class ClipBank:
+    """
+    All clips back to back in one read-only memory-mapped array
+    Each clip is followed by a zero sample: clips maps name -> (start, end)
+    where end is that zero, so reads clamped to end are silent
+    """
+
+    def __init__(self, samples, clips):
+        self.samples = samples
+        self.clips = clips
+
+    def duration(self, name):
+        """Clip length in seconds"""
+        start, end = self.clips[name]
+        return (end - start) / SAMPLE_RATE
+
+
+class ClipLibrary:
+    """
+    Scans CLIPS_DIR for WAV files and builds the clip bank
+    Decoding and resampling happen once per set of files; the bank is
+    cached on disk under a signature of the sources, so restarts only map it
+    """
+
+    def __init__(self, directory=CLIPS_DIR, cache_dir=CLIP_CACHE_DIR):
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.bank = ClipBank(np.zeros(1, dtype=np.float32), {})
+        # Bot handlers refresh from executor threads; two concurrent builds
+        # of the same bank file would zero-fill each other's mapping
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @property
+    def names(self):
+        return list(self.bank.clips)
+
+    def _sources(self):
+        """name -> path of every usable WAV file"""
+        if not os.path.isdir(self.directory):
+            return {}
+
+        sources = {}
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.lower().endswith(".wav"):
+                continue
+            key = clip_key(filename)
+            if not key or key in sources:
+                print(f"⚠️ Skipping clip {filename}: name is empty or already used")
+                continue
+            sources[key] = os.path.join(self.directory, filename)
+        return sources
+
+    def _signature(self, sources):
+        """Hash of the sources and sample rate the bank was built from"""
+        digest = hashlib.sha1(str(SAMPLE_RATE).encode())
+        for key, path in sources.items():
+            stat = os.stat(path)
+            digest.update(f"{key}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()[:16]
+
+    def _build(self, sources, bank_path, index_path):
+        """Decode every clip and write the bank and its index"""
+        clips, decoded, position = {}, [], 0
+        for key, path in sources.items():
+            try:
+                audio = decode_wav(path)
+            except (OSError, ValueError) as e:
+                print(f"❌ Could not load clip {path}: {e}")
+                continue
+            clips[key] = (position, position + len(audio))
+            decoded.append(audio)
+            position += len(audio) + 1
+
+        samples = np.lib.format.open_memmap(
+            bank_path, mode="w+", dtype=np.float32, shape=(max(position, 1),)
+        )
+        samples[:] = 0.0
+        for (start, end), audio in zip(clips.values(), decoded):
+            samples[start:end] = audio
+        samples.flush()
+        del samples
+
+        with open(index_path, "w") as f:
+            json.dump(clips, f)
+
+    def refresh(self):
+        """Rebuild the bank if the clip files changed, then map it"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        sources = self._sources()
+        if not sources:
+            if self.bank.clips:
+                self.bank = ClipBank(np.zeros(1, dtype=np.float32), {})
+            return self.bank
+
+        signature = self._signature(sources)
+        bank_path = os.path.join(self.cache_dir, f"bank-{signature}.npy")
+        index_path = os.path.join(self.cache_dir, f"bank-{signature}.json")
+
+        if not (os.path.exists(bank_path) and os.path.exists(index_path)):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            print(f"🔔 Resampling {len(sources)} clips to {SAMPLE_RATE} Hz...")
+            self._build(sources, bank_path, index_path)
+            self._remove_stale(signature)
+
+        with open(index_path) as f:
+            clips = {key: tuple(span) for key, span in json.load(f).items()}
+
+        # A new file name per signature, so playing voices keep their old mapping
+        self.bank = ClipBank(np.load(bank_path, mmap_mode="r"), clips)
+        print(f"🔔 Clips ready: {', '.join(clips) or 'none'}")
+        return self.bank
+
+    def _remove_stale(self, signature):
+        """Delete banks of older signatures (skipped while still mapped)"""
+        for filename in os.listdir(self.cache_dir):
+            if filename.startswith("bank-") and signature not in filename:
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    pass
+
+
+class Soundboard:
+    """
+    Mixes playing clips into the output
+
+    play() only queues a trigger; the audio thread starts it on its next
+    block. Every playing clip is a (position, end) pair into the bank, so
+    one gather over a (voices, frames) index array and one sum mix all of
+    them, with no per-clip Python work and no allocation per block.
+    """
+
+    def __init__(self, library, max_voices=MAX_CLIP_VOICES, gain=CLIP_GAIN, blocksize=CHUNK_SIZE):
+        self.library = library
+        self.max_voices = max_voices
+        self.gain = gain
+
+        # Triggers from the bot thread: (bank, start, end), or None to stop all
+        self.pending = deque()
+
+        self.positions = np.zeros(max_voices, dtype=np.int64)
+        self.ends = np.zeros(max_voices, dtype=np.int64)
+        self.voices = 0
+        self._bank = None
+        self._allocate(blocksize)
+
+    def _allocate(self, frames):
+        """(Re)allocate mix buffers for blocks of up to frames samples"""
+        self.capacity = frames
+        self._ramp = np.arange(frames, dtype=np.int64)
+        self._index = np.empty((self.max_voices, frames), dtype=np.int64)
+        self._gathered = np.empty((self.max_voices, frames), dtype=np.float32)
+        self._mix = np.empty(frames, dtype=np.float32)
+
+    @property
+    def active(self):
+        """Whether the next block has anything to mix"""
+        return self.voices > 0 or bool(self.pending)
+
+    def play(self, name):
+        """Queue a clip; False if it is not in the library"""
+        bank = self.library.bank
+        if name not in bank.clips:
+            return False
+        start, end = bank.clips[name]
+        self.pending.append((bank, start, end))
+        return True
+
+    def stop(self):
+        """Cut every playing clip"""
+        self.pending.append(None)
+
+    def _start_pending(self):
+        """Turn queued triggers into voices (audio thread)"""
+        while self.pending:
+            trigger = self.pending.popleft()
+            if trigger is None:
+                self.voices = 0
+                continue
+
+            bank, start, end = trigger
+            if bank is not self._bank:
+                # Library was rebuilt - old offsets mean nothing in the new bank
+                self._bank = bank
+                self.voices = 0
+
+            if self.voices == self.max_voices:
+                # Cut the oldest clip
+                self.positions[:-1] = self.positions[1:]
+                self.ends[:-1] = self.ends[1:]
+                self.voices -= 1
+
+            self.positions[self.voices] = start
+            self.ends[self.voices] = end
+            self.voices += 1
+
+    def mix(self, audio, frames):
+        """Add every playing clip to audio in place"""
+        self._start_pending()
+        voices = self.voices
+        if voices == 0:
+            return audio
+        if frames > self.capacity:
+            self._allocate(frames)
+
+        # Sample index of every voice at every frame, clamped to its trailing zero
+        index = self._index[:voices, :frames]
+        np.add(self.positions[:voices, None], self._ramp[:frames], out=index)
+        np.minimum(index, self.ends[:voices, None], out=index)
+
+        # One gather and one sum for all voices
+        gathered = self._gathered[:voices, :frames]
+        np.take(self._bank.samples, index, out=gathered, mode="clip")
+        mix = self._mix[:frames]
+        np.sum(gathered, axis=0, out=mix)
+        mix *= self.gain
+        np.add(audio, mix, out=audio)
+
+        # Advance and drop finished clips
+        self.positions[:voices] += frames
+        playing = self.positions[:voices] < self.ends[:voices]
+        if not playing.all():
+            remaining = int(playing.sum())
+            self.positions[:remaining] = self.positions[:voices][playing]
+            self.ends[:remaining] = self.ends[:voices][playing]
+            self.voices = remaining
+
+        return audio
@@ -0,0 +1,84 @@
+"""
+STFT - Streaming Short-Time Fourier Transform
+Frame-by-frame spectral processing with overlap-add across audio blocks
+"""
+
+import numpy as np
+from scipy import signal
+
+
+class StreamingSTFT:
+    """
+    Streaming STFT with overlap-add resynthesis
+    Calls process_frame(spectrum) once per hop and resynthesizes its result.
+    Works on any block size; output lags input by frame_size samples.
+    """
+
+    def __init__(self, process_frame, frame_size=1024, hop_size=256):
+        if frame_size % hop_size:
+            raise ValueError("frame_size must be a multiple of hop_size")
+
+        self.process_frame = process_frame
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.bins = frame_size // 2 + 1
+
+        # Precomputed analysis / synthesis windows (periodic Hann), scaled so
+        # the product of both overlap-adds to exactly one
+        self.window = signal.get_window('hann', frame_size)
+        overlap = np.sum(self.window ** 2) / hop_size
+        self.synthesis_window = self.window / overlap
+
+        # Reusable buffers
+        self._frame = np.empty(frame_size)
+        self.reset()
+
+    def reset(self):
+        """Clear overlap-add state"""
+        self.input_frame = np.zeros(self.frame_size)
+        self.output_accum = np.zeros(self.frame_size)
+        self.output_hop = np.zeros(self.hop_size)
+        self.fill = 0
+
+    @property
+    def latency(self):
+        """Delay in samples between input and resynthesized output"""
+        return self.frame_size
+
+    def _run_frame(self):
+        """Analyse the current frame, process it and overlap-add the result"""
+        hop = self.hop_size
+
+        np.multiply(self.input_frame, self.window, out=self._frame)
+        spectrum = self.process_frame(np.fft.rfft(self._frame))
+        frame = np.fft.irfft(spectrum, self.frame_size)
+        frame *= self.synthesis_window
+        self.output_accum += frame
+
+        # The oldest hop is complete - no later frame overlaps it
+        self.output_hop[:] = self.output_accum[:hop]
+        self.output_accum[:-hop] = self.output_accum[hop:]
+        self.output_accum[-hop:] = 0.0
+
+        self.input_frame[:-hop] = self.input_frame[hop:]
+
+    def process(self, audio):
+        """Process one block of any length"""
+        n = len(audio)
+        out = np.empty(n)
+        hop = self.hop_size
+        start = self.frame_size - hop
+        pos = 0
+
+        while pos < n:
+            take = min(hop - self.fill, n - pos)
+            self.input_frame[start + self.fill:start + self.fill + take] = audio[pos:pos + take]
+            out[pos:pos + take] = self.output_hop[self.fill:self.fill + take]
+            self.fill += take
+            pos += take
+
+            if self.fill == hop:
+                self._run_frame()
+                self.fill = 0
+
+        return out
@@ -11,8 +11,10 @@ import sys
 import os
 
 # Import config and voice processor
-from config import API_ID, API_HASH, BOT_TOKEN, EFFECTS_CONFIG
+from config import API_ID, API_HASH, BOT_TOKEN, ADMIN_USER_IDS, PROFILE_TOP_N, PROFILE_DIR
 from voice_enhancer import voice_processor
+from profiler import SamplingProfiler
+from preview import PreviewCache
 
 print("🤖 Telegram Voice Enhancer Bot Starting...")
 print("=" * 50)
@@ -26,20 +28,98 @@ app = Client(
 )
 
 # ===================== KEYBOARD BUTTONS =====================
-effect_buttons = InlineKeyboardMarkup([
-    [
-        InlineKeyboardButton("🔥 HIGE", callback_data="effect_hige"),
-        InlineKeyboardButton("⚡ ULTRA", callback_data="effect_ultra")
-    ],
-    [
-        InlineKeyboardButton("🎵 BASS", callback_data="effect_bass"),
-        InlineKeyboardButton("✨ CLEAR", callback_data="effect_clear")
-    ],
-    [
-        InlineKeyboardButton("🤖 ROBOT", callback_data="effect_robot"),
-        InlineKeyboardButton("🔈 NORMAL", callback_data="effect_normal")
-    ]
-])
+# Fallback emoji per preset style
+STYLE_EMOJI = {
+    "normal": "🔈", "hige": "🔥", "ultra": "⚡", "bass": "🎵",
+    "clear": "✨", "robot": "🤖", "pitch": "🎚️"
+}
+
+def effect_emoji(preset):
+    """Emoji shown for a preset"""
+    return preset.get("emoji", STYLE_EMOJI[preset["style"]])
+
+def build_effect_buttons(presets):
+    """Effect keyboard, one preset per row with its preview button"""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(f"{effect_emoji(preset)} {key.upper()}", callback_data=f"effect_{key}"),
+            InlineKeyboardButton("👂 Preview", callback_data=f"preview_{key}")
+        ]
+        for key, preset in presets.items()
+    ])
+
+def effects_text(presets):
+    """One line per preset for the effects menu"""
+    return "\n".join(
+        f"• {effect_emoji(preset)} {key.upper()}: {preset.get('description', preset['name'])}"
+        for key, preset in presets.items()
+    )
+
+effect_buttons = build_effect_buttons(voice_processor.presets)
+
+def build_clip_buttons(names):
+    """Soundboard keyboard, three clips per row plus a stop button"""
+    buttons = [InlineKeyboardButton(f"🔔 {name}", callback_data=f"clip_{name}") for name in names]
+    rows = [buttons[i:i + 3] for i in range(0, len(buttons), 3)]
+    rows.append([InlineKeyboardButton("🔕 Stop Clips", callback_data="clips_stop")])
+    return InlineKeyboardMarkup(rows)
+
+def clips_text(names):
+    """Soundboard menu text"""
+    if not names:
+        return "🔔 **Soundboard:** no clips found\n\nAdd WAV files to the clips folder"
+    return "🔔 **Soundboard:** tap a clip or use /play [clip]"
+
+async def refresh_clips():
+    """Rescan the clip folder off the event loop, return clip names"""
+    loop = asyncio.get_running_loop()
+    bank = await loop.run_in_executor(None, voice_processor.soundboard.library.refresh)
+    return list(bank.clips)
+
+def feedback_text(status):
+    """Active feedback notches for the status view"""
+    if "feedback" not in status:
+        return "off"
+    notches = status["feedback"]["notches"]
+    if not notches:
+        return "no howling"
+    return ", ".join(f"{freq} Hz ({depth} dB)" for freq, depth in notches)
+
+def is_admin(message):
+    """Whether the sender may use admin commands"""
+    return message.from_user is not None and message.from_user.id in ADMIN_USER_IDS
+
+# Only one profiling window at a time
+active_profiler = None
+
+# Effect previews, rendered in the background and re-rendered on preset changes
+preview_cache = PreviewCache()
+
+async def send_preview(message, effect):
+    """Reply with a cached preview, False while it is not ready"""
+    preview = preview_cache.get(effect)
+    if preview is None:
+        return False
+    
+    # After the first upload Telegram's stored copy is reused
+    sent = await message.reply_audio(
+        preview.file_id or preview.file(),
+        title=f"{preview.name} preview",
+        caption=f"👂 **{preview.name}** preview"
+    )
+    media = getattr(sent, "audio", None) or getattr(sent, "document", None)
+    if preview.file_id is None and media is not None:
+        preview.file_id = media.file_id
+    return True
+
+def on_presets_changed(presets):
+    """Rebuild keyboards and previews after a preset reload"""
+    global effect_buttons
+    effect_buttons = build_effect_buttons(presets)
+    preview_cache.refresh(presets)
+    print("🎛️ Effect keyboard updated")
+
+voice_processor.preset_listeners.append(on_presets_changed)
 
 gain_buttons = InlineKeyboardMarkup([
     [
@@ -64,6 +144,9 @@ main_menu_buttons = InlineKeyboardMarkup([
         InlineKeyboardButton("🎛️ Effects", callback_data="menu_effects"),
         InlineKeyboardButton("🔊 Gain", callback_data="menu_gain")
     ],
+    [
+        InlineKeyboardButton("🔔 Soundboard", callback_data="menu_clips")
+    ],
     [
         InlineKeyboardButton("▶️ Start Audio", callback_data="start_audio"),
         InlineKeyboardButton("⏹️ Stop Audio", callback_data="stop_audio")
@@ -88,11 +171,15 @@ async def start_command(client, message):
     • 🎵 BASS - Deep bass boost
     • ✨ CLEAR - Clear voice
     • 🤖 ROBOT - Robot voice effect
+    • 🐿️ CHIPMUNK - Pitch up
+    • 🐻 DEEP - Pitch down
     
     **Commands:**
     /menu - Main control menu
     /effects - Voice effects
+    /preview [effect] - Hear an effect before using it
     /gain [1-5] - Set volume (e.g., /gain 3.5)
+    /play [clip] - Play a soundboard clip
     /startaudio - Start voice enhancement
     /stopaudio - Stop voice enhancement
     /status - Current settings
@@ -117,16 +204,27 @@ async def menu_command(client, message):
 async def effects_command(client, message):
     """Show effects menu"""
     await message.reply(
-        "🎚️ **Select Voice Effect:**\n\n"
-        "• 🔥 HIGE: High gain + bass boost\n"
-        "• ⚡ ULTRA: Extreme gain with compression\n"
-        "• 🎵 BASS: Deep bass enhancement\n"
-        "• ✨ CLEAR: Clear voice with noise reduction\n"
-        "• 🤖 ROBOT: Robot/electronic effect\n"
-        "• 🔈 NORMAL: Original voice",
+        "🎚️ **Select Voice Effect:**\n\n" + effects_text(voice_processor.presets),
         reply_markup=effect_buttons
     )
 
+@app.on_message(filters.command("preview"))
+async def preview_command(client, message):
+    """Send an effect preview from the cache"""
+    args = message.text.split()
+    if len(args) < 2:
+        await message.reply(
+            "👂 **Effect Previews:**\nTap 👂 next to an effect, or use /preview [effect]",
+            reply_markup=effect_buttons
+        )
+        return
+    
+    effect = args[1].lower()
+    if effect not in voice_processor.presets:
+        await message.reply(f"❌ Unknown effect: {effect}\nUse /effects to see all effects")
+    elif not await send_preview(message, effect):
+        await message.reply("⏳ Previews are still rendering, try again in a moment")
+
 @app.on_message(filters.command("gain"))
 async def gain_command(client, message):
     """Set gain from command"""
@@ -151,6 +249,60 @@ async def gain_command(client, message):
     except Exception as e:
         await message.reply(f"❌ Error: {str(e)}")
 
+@app.on_message(filters.command("play"))
+async def play_command(client, message):
+    """Play a soundboard clip, or show the clip keyboard"""
+    args = message.text.split()
+    if len(args) > 1:
+        name = args[1].lower()
+        if not voice_processor.is_processing:
+            await message.reply("⚠️ Audio is stopped - use /startaudio first")
+        elif voice_processor.play_clip(name):
+            await message.reply(f"🔔 Playing: **{name}**")
+        else:
+            await message.reply(f"❌ Unknown clip: {name}\nUse /play to see all clips")
+        return
+    
+    names = await refresh_clips()
+    await message.reply(clips_text(names), reply_markup=build_clip_buttons(names))
+
+@app.on_message(filters.command("profile"))
+async def profile_command(client, message):
+    """Profile the audio and bot threads for a few seconds (admins only)"""
+    global active_profiler
+    
+    if not is_admin(message):
+        await message.reply("⛔ Admins only - add your user ID to ADMIN_USER_IDS in config.py")
+        return
+    if active_profiler is not None:
+        await message.reply("⚠️ A profile is already running")
+        return
+    
+    try:
+        args = message.text.split()
+        seconds = float(args[1]) if len(args) > 1 else 10.0
+        
+        active_profiler = SamplingProfiler(
+            thread_labels=voice_processor.thread_labels,
+            native_ids=voice_processor.thread_native_ids
+        )
+        seconds = active_profiler.start(seconds)
+        await message.reply(f"🔬 Profiling for **{seconds:.0f}s**...")
+        
+        # The bot keeps serving while the sampler thread works
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, active_profiler.wait)
+        path = await loop.run_in_executor(None, active_profiler.save, PROFILE_DIR)
+        
+        await message.reply(active_profiler.summary(PROFILE_TOP_N))
+        await message.reply_document(path, caption="🔥 Collapsed stacks (flamegraph.pl / speedscope)")
+    except ValueError:
+        await message.reply("⚠️ Usage: /profile [seconds]")
+    except Exception as e:
+        await message.reply(f"❌ Error: {str(e)}")
+    finally:
+        active_profiler = None
+
 @app.on_message(filters.command("startaudio"))
 async def start_audio_command(client, message):
     """Start audio processing"""
@@ -194,7 +346,10 @@ async def status_command(client, message):
     • **Gain:** {status['gain']}x
     • **Status:** {'🟢 RUNNING' if status['is_processing'] else '🔴 STOPPED'}
     • **Sample Rate:** {status['sample_rate']} Hz
-    
+    • **Quality:** {status['quality']}{f" (CPU {status['cpu']['load']:.0%})" if 'cpu' in status else ''}
+    • **Feedback:** {feedback_text(status)}
+    {f"• **Fan-out:** {', '.join(effect.upper() for effect in status['fanout'])}" if status['fanout'] else ''}
+    {f"• **Denoiser:** {status['denoiser']['cpu_us_per_block']:.0f} µs/block, +{status['denoiser']['latency_ms']:.1f} ms" if 'denoiser' in status else ''}
     **Next Steps:**
     /effects - Change voice effect
     /gain - Adjust volume
@@ -212,9 +367,9 @@ async def handle_callback(client, callback_query):
     try:
         if data.startswith("effect_"):
             # Handle effect selection
-            effect = data.split("_")[1]
+            effect = data.split("_", 1)[1]
             if voice_processor.change_effect(effect):
-                effect_name = EFFECTS_CONFIG.get(effect, {}).get("name", effect.upper())
+                effect_name = voice_processor.presets.get(effect, {}).get("name", effect.upper())
                 await callback_query.answer(f"✅ Effect: {effect_name}")
                 await callback_query.message.edit_text(
                     f"🎛️ **Effect Selected:** {effect_name}\n"
@@ -239,6 +394,38 @@ async def handle_callback(client, callback_query):
             else:
                 await callback_query.answer("❌ Invalid gain value")
         
+        elif data.startswith("preview_"):
+            # Handle effect preview
+            effect = data.split("_", 1)[1]
+            if await send_preview(callback_query.message, effect):
+                effect_name = voice_processor.presets.get(effect, {}).get("name", effect.upper())
+                await callback_query.answer(f"👂 {effect_name}")
+            else:
+                await callback_query.answer("⏳ Preview still rendering, try again in a moment")
+        
+        elif data.startswith("clip_"):
+            # Handle soundboard clip
+            name = data.split("_", 1)[1]
+            if not voice_processor.is_processing:
+                await callback_query.answer("⚠️ Audio is stopped - use /startaudio first")
+            elif voice_processor.play_clip(name):
+                await callback_query.answer(f"🔔 {name}")
+            else:
+                await callback_query.answer("❌ Clip no longer available")
+        
+        elif data == "clips_stop":
+            voice_processor.stop_clips()
+            await callback_query.answer("🔕 Clips stopped")
+        
+        elif data == "menu_clips":
+            # Show soundboard
+            await callback_query.answer("Opening soundboard...")
+            names = await refresh_clips()
+            await callback_query.message.edit_text(
+                clips_text(names),
+                reply_markup=build_clip_buttons(names)
+            )
+        
         elif data == "menu_effects":
             # Show effects menu
             await callback_query.answer("Opening effects menu...")
@@ -301,7 +488,9 @@ async def handle_callback(client, callback_query):
             • **Gain:** {status['gain']}x
             • **Status:** {'🟢 RUNNING' if status['is_processing'] else '🔴 STOPPED'}
             • **Sample Rate:** {status['sample_rate']} Hz
-            
+            • **Quality:** {status['quality']}{f" (CPU {status['cpu']['load']:.0%})" if 'cpu' in status else ''}
+            • **Feedback:** {feedback_text(status)}
+            {f"• **Fan-out:** {', '.join(effect.upper() for effect in status['fanout'])}" if status['fanout'] else ''}
             **Controls:**
             Use buttons below to manage
             """
@@ -333,7 +522,9 @@ async def handle_all_messages(client, message):
             "/start - Show help\n"
             "/menu - Main menu\n"
             "/effects - Voice effects\n"
+            "/preview - Hear effects\n"
             "/gain - Volume control\n"
+            "/play - Soundboard clips\n"
             "/startaudio - Start processing\n"
             "/stopaudio - Stop processing\n"
             "/status - Current settings"
@@ -353,6 +544,12 @@ def main():
     print("💡 Use /startaudio to begin voice enhancement")
     print("=" * 50)
     
+    # Pick up preset edits without restarting the audio stream
+    voice_processor.start_preset_watcher()
+    
+    # Render effect previews in the background
+    preview_cache.refresh(voice_processor.presets)
+    
     try:
         # Run the bot
         app.run()
@@ -8,7 +8,24 @@ from scipy import signal
 import sounddevice as sd
 import threading
 import time
-from config import SAMPLE_RATE, EFFECTS_CONFIG
+from config import (
+    SAMPLE_RATE, CHUNK_SIZE, CPU_GUARD_ENABLED, BASS_DECIMATION, PRESETS_FILE, AUDIO_DTYPE,
+    DENOISE_FRAME_SIZE, DENOISE_HOP_SIZE, DENOISE_FLOOR_DB,
+    FEEDBACK_ENABLED, FEEDBACK_DECIMATION, FEEDBACK_MAX_NOTCHES, FEEDBACK_MAX_DEPTH_DB,
+    NET_OUTPUT, FANOUT_ROUTES
+)
+from multirate import MultirateLowpass, switch_lowpass
+from denoiser import SpectralDenoiser
+from feedback import FeedbackSuppressor
+from presets import load_presets_or_default, compile_presets, PresetWatcher
+from fanout import FanoutRenderer
+from sinks import make_sink
+from sample_format import SampleFormat
+from soundboard import ClipLibrary, Soundboard
+from cpu_guard import (
+    CPUGuard, QUALITY_FULL, QUALITY_REDUCED, QUALITY_NO_TREBLE, QUALITY_BYPASS,
+    QUALITY_NAMES
+)
 
 class VoiceProcessor:
     """
@@ -16,30 +33,77 @@ class VoiceProcessor:
     Applies effects like HIGE, ULTRA, BASS BOOST to microphone input
     """
     
-    def __init__(self):
+    def __init__(self, presets=None, realtime=True):
+        # presets overrides PRESETS_FILE; realtime=False builds an offline
+        # processor without soundboard, feedback suppression or CPU guard
+        self.realtime = realtime
         self.current_effect = "hige"
         self.current_gain = 2.5
         self.is_processing = False
         self.stream = None
         self.processing_thread = None
+        self.audio_thread_id = None
+        self.audio_native_id = None
+        
+        # Device sample conversion, rebuilt from each stream's negotiated format
+        self.input_format = SampleFormat("float32", 1, CHUNK_SIZE)
+        self.output_format = SampleFormat("float32", 1, CHUNK_SIZE)
+        
+        # Fan-out mode: several presets rendered to their own sinks
+        self.fanout = None
+        self.fanout_sinks = {}
+        self.fanout_feedback = {}
+        
+        # Extra destinations for the processed voice (e.g. a UDP stream)
+        self.output_sinks = []
         
         # Audio buffers
         self.input_buffer = []
         self.output_buffer = []
         
+        # Effect presets, compiled into a bank that is swapped atomically
+        if presets is None:
+            presets = load_presets_or_default(PRESETS_FILE)
+        self.effect_bank = compile_presets(presets)
+        self.preset_listeners = []
+        self.preset_watcher = None
+        
         # Effect parameters
         self.setup_filters()
         
+        # Noise suppression for CLEAR
+        self.denoiser = SpectralDenoiser(
+            SAMPLE_RATE, DENOISE_FRAME_SIZE, DENOISE_HOP_SIZE, DENOISE_FLOOR_DB
+        )
+        
+        # Howling detection and notches on the processed voice
+        self.feedback = self.make_feedback_suppressor() if FEEDBACK_ENABLED and realtime else None
+        
+        # Soundboard clips mixed over the processed voice
+        self.soundboard = Soundboard(ClipLibrary()) if realtime else None
+        
+        # CPU budget guard
+        self.quality_level = QUALITY_FULL
+        self.cpu_guard = CPUGuard(SAMPLE_RATE) if CPU_GUARD_ENABLED and realtime else None
+        
+        if not realtime:
+            return
+        
         print("🎤 Voice Processor Initialized")
         print(f"Default Effect: {self.current_effect.upper()}")
         print(f"Default Gain: {self.current_gain}x")
     
+    def make_feedback_suppressor(self):
+        """Feedback suppressor for one output path"""
+        return FeedbackSuppressor(
+            SAMPLE_RATE, FEEDBACK_DECIMATION, max_notches=FEEDBACK_MAX_NOTCHES,
+            max_depth_db=FEEDBACK_MAX_DEPTH_DB
+        )
+    
     def setup_filters(self):
         """Setup audio filters for effects"""
-        # Low-pass filter for bass
-        self.bass_sos = signal.butter(
-            4, 150, 'lowpass', fs=SAMPLE_RATE, output='sos'
-        )
+        # Low-pass filter for bass, run at a decimated rate
+        self.bass_multirate = MultirateLowpass(4, 150, SAMPLE_RATE, BASS_DECIMATION)
         
         # High-pass filter for clarity
         self.treble_sos = signal.butter(
@@ -55,72 +119,119 @@ class VoiceProcessor:
         self.robot_sos = signal.butter(
             6, [500, 2500], 'bandpass', fs=SAMPLE_RATE, output='sos'
         )
+        
+        # Cheaper low-order variants used when the CPU guard steps down
+        self.bass_multirate_lite = MultirateLowpass(2, 150, SAMPLE_RATE, BASS_DECIMATION)
+        self.bass_lite_active = False
+        self.lite_sos = {
+            "treble": signal.butter(2, 3000, 'highpass', fs=SAMPLE_RATE, output='sos'),
+            "voice": signal.butter(2, [300, 3400], 'bandpass', fs=SAMPLE_RATE, output='sos'),
+            "robot": signal.butter(3, [500, 2500], 'bandpass', fs=SAMPLE_RATE, output='sos')
+        }
     
-    def apply_hige_effect(self, audio):
+    @property
+    def presets(self):
+        """Currently active presets"""
+        return self.effect_bank.presets
+    
+    def apply_filter(self, name, audio):
+        """Run a named filter at the order allowed by the current quality level"""
+        if name == "bass":
+            lite = self.quality_level >= QUALITY_REDUCED
+            bass = self.bass_multirate_lite if lite else self.bass_multirate
+            if lite != self.bass_lite_active:
+                # The other order sat idle - cross-fade to it from fresh state
+                self.bass_lite_active = lite
+                other = self.bass_multirate if lite else self.bass_multirate_lite
+                return switch_lowpass(other, bass, audio)
+            return bass.process(audio)
+        
+        if self.quality_level >= QUALITY_REDUCED:
+            sos = self.lite_sos[name]
+        else:
+            sos = getattr(self, f"{name}_sos")
+        return signal.sosfilt(sos, audio)
+    
+    def treble_enabled(self):
+        """Whether the treble pass fits in the current CPU budget"""
+        return self.quality_level < QUALITY_NO_TREBLE
+    
+    def apply_hige_effect(self, audio, preset):
         """Apply HIGE (High Gain + Bass) effect"""
         # Boost volume
-        audio = audio * 2.5
+        audio = audio * preset["gain"]
         
         # Add bass
-        bass = signal.sosfilt(self.bass_sos, audio)
-        audio = audio + (bass * 0.7)
+        bass = self.apply_filter("bass", audio)
+        audio = audio + (bass * preset["bass"])
         
         # Add slight treble
-        treble = signal.sosfilt(self.treble_sos, audio)
-        audio = audio + (treble * 0.3)
+        if self.treble_enabled():
+            treble = self.apply_filter("treble", audio)
+            audio = audio + (treble * preset["treble"])
         
         return audio
     
-    def apply_ultra_effect(self, audio):
+    def apply_ultra_effect(self, audio, preset):
         """Apply ULTRA (Extreme Gain) effect"""
         # Extreme volume boost
-        audio = audio * 3.5
+        audio = audio * preset["gain"]
         
         # Compression to prevent clipping
         audio = np.tanh(audio * 1.5) / 1.5
         
         # Enhance bass and treble
-        bass = signal.sosfilt(self.bass_sos, audio) * 0.9
-        treble = signal.sosfilt(self.treble_sos, audio) * 0.5
-        audio = audio + bass + treble
+        bass = self.apply_filter("bass", audio) * preset["bass"]
+        if self.treble_enabled():
+            treble = self.apply_filter("treble", audio) * preset["treble"]
+            audio = audio + bass + treble
+        else:
+            audio = audio + bass
         
         return audio
     
-    def apply_bass_effect(self, audio):
+    def apply_bass_effect(self, audio, preset):
         """Apply BASS BOOST effect"""
         # Moderate volume
-        audio = audio * 2.0
+        audio = audio * preset["gain"]
         
         # Heavy bass boost
-        bass = signal.sosfilt(self.bass_sos, audio)
-        audio = audio + (bass * 1.2)
+        bass = self.apply_filter("bass", audio)
+        audio = audio + (bass * preset["bass"])
         
         # Reduce treble
-        audio = signal.sosfilt(self.treble_sos, audio) * 0.1
+        if self.treble_enabled():
+            audio = self.apply_filter("treble", audio) * preset["treble"]
+        else:
+            audio = audio * preset["treble"]
         
         return audio
     
-    def apply_clear_effect(self, audio):
+    def apply_clear_effect(self, audio, preset):
         """Apply CLEAR VOICE effect"""
+        # Suppress background noise
+        audio = self.denoiser.process(audio)
+        
         # Focus on voice frequencies
-        audio = signal.sosfilt(self.voice_sos, audio)
+        audio = self.apply_filter("voice", audio)
         
         # Volume boost
-        audio = audio * 2.2
+        audio = audio * preset["gain"]
         
         # Enhance clarity
-        treble = signal.sosfilt(self.treble_sos, audio) * 0.8
-        audio = audio + treble
+        if self.treble_enabled():
+            treble = self.apply_filter("treble", audio) * preset["treble"]
+            audio = audio + treble
         
         return audio
     
-    def apply_robot_effect(self, audio):
+    def apply_robot_effect(self, audio, preset):
         """Apply ROBOT VOICE effect"""
         # Robot-like bandpass
-        audio = signal.sosfilt(self.robot_sos, audio)
+        audio = self.apply_filter("robot", audio)
         
         # Volume boost
-        audio = audio * 2.5
+        audio = audio * preset["gain"]
         
         # Bitcrusher effect for robotic sound
         step = 0.05
@@ -128,72 +239,146 @@ class VoiceProcessor:
         
         return audio
     
+    def apply_pitch_effect(self, audio, preset, shifter):
+        """Apply PITCH SHIFT effect (CHIPMUNK, DEEP)"""
+        # Volume boost
+        audio = audio * preset["gain"]
+        
+        # Phase-vocoder pitch shift
+        audio = shifter.process(audio)
+        
+        return audio
+    
+    def prepare_audio(self, audio_data):
+        """Float samples in [-1, 1) for processing (no copy if already float32)"""
+        return np.asarray(audio_data, dtype=np.float32)
+    
+    def finish_audio(self, audio, gain):
+        """Apply final gain and prevent clipping"""
+        # Apply final gain
+        audio = audio * gain
+        
+        # Prevent clipping - quantization happens once, in the output format
+        return np.clip(audio, -0.99, 0.99)
+    
     def process_audio(self, audio_data):
-        """Main audio processing function"""
+        """Main audio processing function, float in and float out"""
         # Convert to float for processing
-        audio = audio_data.astype(np.float32) / 32768.0
+        audio = self.prepare_audio(audio_data)
+        
+        # One bank per block, so a preset reload never splits a block
+        bank = self.effect_bank
+        effect = self.current_effect
+        preset = bank.presets.get(effect)
+        style = preset["style"] if preset else None
         
         # Apply selected effect
-        if self.current_effect == "hige":
-            audio = self.apply_hige_effect(audio)
-        elif self.current_effect == "ultra":
-            audio = self.apply_ultra_effect(audio)
-        elif self.current_effect == "bass":
-            audio = self.apply_bass_effect(audio)
-        elif self.current_effect == "clear":
-            audio = self.apply_clear_effect(audio)
-        elif self.current_effect == "robot":
-            audio = self.apply_robot_effect(audio)
-        elif self.current_effect == "normal":
+        if preset is None:
+            # Effect removed by a reload that is still switching over
+            pass
+        elif self.quality_level >= QUALITY_BYPASS:
+            # CPU budget exceeded - keep the preset gain only
+            audio = audio * preset["gain"]
+        elif style == "hige":
+            audio = self.apply_hige_effect(audio, preset)
+        elif style == "ultra":
+            audio = self.apply_ultra_effect(audio, preset)
+        elif style == "bass":
+            audio = self.apply_bass_effect(audio, preset)
+        elif style == "clear":
+            audio = self.apply_clear_effect(audio, preset)
+        elif style == "robot":
+            audio = self.apply_robot_effect(audio, preset)
+        elif style == "pitch":
+            audio = self.apply_pitch_effect(audio, preset, bank.pitch_shifters[effect])
+        elif style == "normal":
             # Normal voice (just gain)
             audio = audio * self.current_gain
         
-        # Apply final gain
-        audio = audio * self.current_gain
-        
-        # Prevent clipping
-        audio = np.clip(audio, -0.99, 0.99)
+        # Notch out acoustic feedback, at every quality level
+        if self.feedback:
+            audio = self.feedback.process(audio)
         
-        # Convert back to int16
-        audio = (audio * 32767.0).astype(np.int16)
-        
-        return audio
+        return self.finish_audio(audio, self.current_gain)
+    
+    def render_offline(self, audio, effect, blocksize=CHUNK_SIZE):
+        """Run a whole float signal through one effect, block by block"""
+        self.current_effect = effect
+        self.current_gain = self.presets[effect]["gain"]
+        return np.concatenate([
+            self.process_audio(audio[i:i + blocksize])
+            for i in range(0, len(audio), blocksize)
+        ])
     
     def audio_callback(self, indata, outdata, frames, time_info, status):
         """SoundDevice callback for real-time processing"""
         if status:
             print(f"Audio Status: {status}")
         
+        start = time.perf_counter()
+        self.audio_thread_id = threading.get_ident()
+        self.audio_native_id = threading.get_native_id()
+        
         # Process incoming audio
         if indata is not None and len(indata) > 0:
-            processed = self.process_audio(indata[:, 0])
+            audio = self.input_format.read(indata, frames)
+            processed = self.process_audio(audio)
+            
+            # Mix any playing soundboard clips
+            if self.soundboard and self.soundboard.active:
+                processed = self.soundboard.mix(processed, frames)
             
-            # Output processed audio
-            outdata[:, 0] = processed.astype(np.float32) / 32768.0
+            for sink in self.output_sinks:
+                sink.write(processed)
             
-            # If stereo output, duplicate to right channel
-            if outdata.shape[1] > 1:
-                outdata[:, 1] = outdata[:, 0]
+            # Output processed audio to every channel
+            self.output_format.write(outdata, processed, frames)
+        
+        # Let the CPU guard pick the quality level for the next block
+        if self.cpu_guard:
+            self.quality_level = self.cpu_guard.update(
+                time.perf_counter() - start, frames
+            )
     
     def start_processing(self):
-        """Start real-time audio processing"""
+        """Start real-time audio processing (fan-out when FANOUT_ROUTES is set)"""
         if self.is_processing:
             print("⚠️ Processing already running!")
             return False
         
+        if FANOUT_ROUTES:
+            return self.start_fanout(FANOUT_ROUTES)
+        
         try:
             print("🚀 Starting voice processing...")
             print(f"Effect: {self.current_effect.upper()}")
             print(f"Gain: {self.current_gain}x")
             
-            # Start audio stream
-            self.stream = sd.Stream(
+            # Start audio stream (packed 24-bit needs a raw stream)
+            stream_class = sd.RawStream if AUDIO_DTYPE == "int24" else sd.Stream
+            self.stream = stream_class(
                 callback=self.audio_callback,
                 channels=1,
                 samplerate=SAMPLE_RATE,
-                blocksize=1024,
-                dtype='float32'
+                blocksize=CHUNK_SIZE,
+                dtype=AUDIO_DTYPE
             )
+            self.setup_formats(self.stream)
+            
+            if self.cpu_guard:
+                self.cpu_guard.reset()
+                self.quality_level = QUALITY_FULL
+            
+            # A new device setup has a different acoustic path
+            if self.feedback:
+                self.feedback.reset()
+            
+            # Clips triggered while stopped must not all fire at once now
+            if self.soundboard:
+                self.soundboard.pending.clear()
+            
+            if NET_OUTPUT:
+                self.output_sinks = [make_sink(NET_OUTPUT, SAMPLE_RATE, CHUNK_SIZE)]
             
             self.stream.start()
             self.is_processing = True
@@ -208,24 +393,150 @@ class VoiceProcessor:
             print(f"❌ Error starting audio processing: {e}")
             return False
     
+    def fanout_callback(self, indata, frames, time_info, status):
+        """SoundDevice input callback for fan-out mode"""
+        if status:
+            print(f"Audio Status: {status}")
+        
+        start = time.perf_counter()
+        self.audio_thread_id = threading.get_ident()
+        self.audio_native_id = threading.get_native_id()
+        
+        # Render every routed preset from the same input block
+        audio = self.input_format.read(indata, frames)
+        for effect, rendered in self.fanout.render(audio).items():
+            # Every route plays into its own room, with its own notches
+            if effect in self.fanout_feedback:
+                rendered = self.fanout_feedback[effect].process(rendered)
+            self.fanout_sinks[effect].write(self.finish_audio(rendered, self.fanout.gains[effect]))
+        
+        if self.cpu_guard:
+            self.quality_level = self.cpu_guard.update(
+                time.perf_counter() - start, frames
+            )
+    
+    def start_fanout(self, routes):
+        """
+        Start fan-out processing
+        routes maps effect name -> output device, callable or sink
+        """
+        if self.is_processing:
+            print("⚠️ Processing already running!")
+            return False
+        
+        try:
+            self.fanout = FanoutRenderer(self, routes.keys())
+            self.fanout_sinks = {
+                effect: make_sink(target, SAMPLE_RATE, CHUNK_SIZE)
+                for effect, target in routes.items()
+            }
+            self.fanout_feedback = {
+                effect: self.make_feedback_suppressor() for effect in routes
+            } if self.feedback else {}
+            
+            print("🚀 Starting fan-out processing...")
+            for effect, target in routes.items():
+                print(f"  {effect.upper()} → {target}")
+            
+            stream_class = sd.RawInputStream if AUDIO_DTYPE == "int24" else sd.InputStream
+            self.stream = stream_class(
+                callback=self.fanout_callback,
+                channels=1,
+                samplerate=SAMPLE_RATE,
+                blocksize=CHUNK_SIZE,
+                dtype=AUDIO_DTYPE
+            )
+            self.setup_formats(self.stream)
+            
+            if self.cpu_guard:
+                self.cpu_guard.reset()
+                self.quality_level = QUALITY_FULL
+            
+            self.stream.start()
+            self.is_processing = True
+            
+            print("✅ Fan-out processing ACTIVE!")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error starting fan-out: {e}")
+            self.close_fanout()
+            return False
+    
+    def setup_formats(self, stream):
+        """Build sample converters for the format and channels the device granted"""
+        dtype, channels = stream.dtype, stream.channels
+        if isinstance(dtype, str):
+            # Input-only stream
+            self.input_format = SampleFormat(dtype, channels, CHUNK_SIZE)
+            return
+        self.input_format = SampleFormat(dtype[0], channels[0], CHUNK_SIZE)
+        self.output_format = SampleFormat(dtype[1], channels[1], CHUNK_SIZE)
+        print(f"🎚️ Sample format: {dtype[0]} in / {dtype[1]} out")
+    
+    def close_fanout(self):
+        """Close fan-out sinks"""
+        for sink in self.fanout_sinks.values():
+            sink.close()
+        self.fanout_sinks = {}
+        self.fanout_feedback = {}
+        self.fanout = None
+    
     def stop_processing(self):
         """Stop audio processing"""
         if self.stream and self.is_processing:
             print("🛑 Stopping voice processing...")
             self.stream.stop()
             self.stream.close()
+            self.close_fanout()
+            for sink in self.output_sinks:
+                sink.close()
+            self.output_sinks = []
             self.is_processing = False
             print("✅ Processing stopped")
             return True
         return False
     
+    def install_presets(self, presets):
+        """Compile new presets and swap them in without touching the stream"""
+        # Compiled here, on the caller's thread, never in the audio callback
+        old_preset = self.presets.get(self.current_effect)
+        bank = compile_presets(presets, self.effect_bank)
+        
+        # Single assignment: each block sees either the old or the new bank
+        self.effect_bank = bank
+        print(f"🔄 Presets loaded: {', '.join(name.upper() for name in bank.presets)}")
+        
+        # An edited gain of the active preset replaces its final gain too
+        new_preset = bank.presets.get(self.current_effect)
+        if old_preset and new_preset and new_preset["gain"] != old_preset["gain"]:
+            self.current_gain = new_preset["gain"]
+            print(f"📊 Gain: {self.current_gain}x")
+        
+        if self.current_effect not in bank.presets:
+            fallback = "normal" if "normal" in bank.presets else next(iter(bank.presets))
+            print(f"⚠️ {self.current_effect.upper()} was removed")
+            self.change_effect(fallback)
+        
+        for listener in self.preset_listeners:
+            listener(bank.presets)
+    
+    def start_preset_watcher(self, path=PRESETS_FILE):
+        """Reload presets in the background whenever the file changes"""
+        if self.preset_watcher is None:
+            self.preset_watcher = PresetWatcher(path, self.install_presets)
+            self.preset_watcher.start()
+    
     def change_effect(self, effect_name):
         """Change current voice effect"""
-        if effect_name in EFFECTS_CONFIG:
+        presets = self.presets
+        if effect_name in presets:
+            if effect_name != self.current_effect:
+                self.reset_idle_state(effect_name)
             self.current_effect = effect_name
-            self.current_gain = EFFECTS_CONFIG[effect_name]["gain"]
+            self.current_gain = presets[effect_name]["gain"]
             
-            print(f"✅ Effect changed to: {EFFECTS_CONFIG[effect_name]['name']}")
+            print(f"✅ Effect changed to: {presets[effect_name]['name']}")
             print(f"📊 Gain: {self.current_gain}x")
             
             return True
@@ -233,6 +544,42 @@ class VoiceProcessor:
             print(f"❌ Invalid effect: {effect_name}")
             return False
     
+    def reset_idle_state(self, effect_name):
+        """Drop audio an STFT effect kept from when it was last selected"""
+        shifter = self.effect_bank.pitch_shifters.get(effect_name)
+        if shifter is not None:
+            shifter.request_reset()
+        if self.presets[effect_name]["style"] == "clear":
+            self.denoiser.request_stft_reset()
+    
+    def thread_labels(self):
+        """Names for threads the profiler cannot name itself"""
+        if self.audio_thread_id is None:
+            return {}
+        return {self.audio_thread_id: "audio"}
+    
+    def thread_native_ids(self):
+        """OS thread ids of threads the threading module does not know"""
+        if self.audio_thread_id is None:
+            return {}
+        return {self.audio_thread_id: self.audio_native_id}
+    
+    def play_clip(self, name):
+        """Start a soundboard clip (only while audio is running)"""
+        if not self.is_processing:
+            print(f"⚠️ Not playing {name}: audio is stopped")
+            return False
+        if self.soundboard.play(name):
+            print(f"🔔 Playing clip: {name}")
+            return True
+        print(f"❌ Unknown clip: {name}")
+        return False
+    
+    def stop_clips(self):
+        """Cut all soundboard clips"""
+        self.soundboard.stop()
+        print("🔕 Clips stopped")
+    
     def change_gain(self, gain_value):
         """Change volume gain"""
         if 0.1 <= gain_value <= 5.0:
@@ -245,13 +592,23 @@ class VoiceProcessor:
     
     def get_status(self):
         """Get current processing status"""
-        return {
+        status = {
             "effect": self.current_effect,
-            "effect_name": EFFECTS_CONFIG.get(self.current_effect, {}).get("name", "Unknown"),
+            "effect_name": self.presets.get(self.current_effect, {}).get("name", "Unknown"),
             "gain": self.current_gain,
             "is_processing": self.is_processing,
-            "sample_rate": SAMPLE_RATE
+            "sample_rate": SAMPLE_RATE,
+            "quality": QUALITY_NAMES[self.quality_level],
+            "fanout": list(self.fanout_sinks),
+            "clips_playing": self.soundboard.voices if self.soundboard else 0
         }
+        if self.cpu_guard:
+            status["cpu"] = self.cpu_guard.get_stats()
+        if self.feedback:
+            status["feedback"] = self.feedback.get_stats()
+        if self.presets.get(self.current_effect, {}).get("style") == "clear":
+            status["denoiser"] = self.denoiser.get_stats()
+        return status
 
 # Global instance
 voice_processor = VoiceProcessor()